@@ -1,38 +1,97 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# FAST_START=1 builds a one-folder app (dist/PDFExcelComparer/) instead of a
+# single exe. The one-file exe unpacks Python, pandas, PyMuPDF and Tesseract
+# into a new temp folder on every launch; the one-folder app is unpacked once,
+# when it is copied into place, and starts straight from there.
+FAST_START = os.environ.get('FAST_START') == '1'
+
+# Ship only what OCR needs: the Tesseract executable and its DLLs, English
+# data and the config files pytesseract uses (image_to_data needs configs/tsv).
+# The training tools' jars (ScrollView, piccolo2d, jaxb) and pdf.ttf stay out.
+TESSERACT_DIR = 'Tesseract-OCR'
+TESSDATA_FILES = ['eng.traineddata']
+TESSDATA_DIRS = ['configs', 'tessconfigs']
+
+
+def tesseract_datas():
+    # Sources are found next to this spec file, wherever pyinstaller is run
+    # from; destinations are relative to the bundle
+    source_dir = os.path.join(SPECPATH, TESSERACT_DIR)
+    datas = []
+    for name in os.listdir(source_dir):
+        if name.lower().endswith(('.exe', '.dll')):
+            datas.append((os.path.join(source_dir, name), TESSERACT_DIR))
+    tessdata = os.path.join(TESSERACT_DIR, 'tessdata')
+    for name in TESSDATA_FILES:
+        datas.append((os.path.join(SPECPATH, tessdata, name), tessdata))
+    for name in TESSDATA_DIRS:
+        datas.append((os.path.join(SPECPATH, tessdata, name), os.path.join(tessdata, name)))
+    return datas
 
 
 a = Analysis(
     ['comparer_app.py'],
     pathex=[],
     binaries=[],
-    datas=[('Tesseract-OCR', 'Tesseract-OCR')],
+    datas=tesseract_datas(),
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Optional pandas/PIL extras the app never uses; less to unpack at launch
+    excludes=['matplotlib', 'scipy', 'IPython', 'pytest'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='PDFExcelComparer',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if FAST_START:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='PDFExcelComparer',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,  # decompressing UPX'd DLLs on every launch costs more than it saves
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='PDFExcelComparer',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='PDFExcelComparer',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
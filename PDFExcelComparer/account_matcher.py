@@ -0,0 +1,128 @@
+"""
+Indexed approximate matching of PDF account numbers to Excel account numbers.
+
+OCR misreads a digit or two, so a PDF account that isn't in the Excel export
+is paired with an unclaimed Excel account that has the same amount and an
+account number that is one edit away (a substitution, insertion, deletion or
+adjacent swap). Among several such accounts, one that only differs in digits
+Tesseract tends to mix up is preferred. Candidates come from hash lookups instead of a scan over
+every Excel account, so each lookup costs about the same however large the
+export is.
+"""
+from collections import defaultdict
+
+# Digits that Tesseract commonly mistakes for each other on ledger prints
+CONFUSABLE_GROUPS = ("03689", "17")
+
+# A substitution between two confusable characters costs this much; any other edit costs 1.
+# It only ranks candidates: every accepted account is within MAX_EDITS edits.
+CONFUSABLE_COST = 0.5
+
+# Most edits (of any kind) between two account numbers still accepted as the same account.
+# Two different accounts can easily be two confusable digits apart (W1234567, W7284567).
+MAX_EDITS = 1
+
+# Largest weighted edit distance still accepted as the same account
+MAX_DISTANCE = 1.0
+
+_confusion_table = str.maketrans({char: group[0] for group in CONFUSABLE_GROUPS for char in group})
+_confusable_pairs = {(a, b) for group in CONFUSABLE_GROUPS for a in group for b in group if a != b}
+
+
+def confusion_key(account):
+    """Maps every confusable digit to one representative, so W1234567 and W1284567 share a key."""
+    return account.translate(_confusion_table)
+
+
+def _deletion_variants(account):
+    # The account plus every string with one character removed; two accounts
+    # within one substitution, insertion, deletion or swap share a variant
+    variants = {account}
+    for i in range(len(account)):
+        variants.add(account[:i] + account[i + 1:])
+    return variants
+
+
+def _cents(amount):
+    return int(round(amount * 100))
+
+
+def account_distance(a, b, limit=MAX_DISTANCE, confusable_cost=CONFUSABLE_COST):
+    """
+    Weighted edit distance (optimal string alignment) between two account
+    numbers. Confusable substitutions cost confusable_cost; with 1 this is
+    the plain number of edits. Returns a value above limit as soon as the
+    distance is known to exceed it.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [float(i)] + [0.0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                substitution = 0.0
+            elif (a[i - 1], b[j - 1]) in _confusable_pairs:
+                substitution = confusable_cost
+            else:
+                substitution = 1.0
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + substitution)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)  # adjacent swap
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class AccountIndex:
+    """
+    Unclaimed Excel accounts bucketed by amount in cents, by confusion_key and
+    by one-deletion variants. take() hands out each account at most once.
+    """
+
+    def __init__(self, excel_data, exclude=()):
+        self._amounts = {}
+        self._by_key = defaultdict(set)
+        self._by_variant = defaultdict(set)
+        for account, amount in excel_data.items():
+            if account in exclude:
+                continue
+            cents = _cents(amount)
+            self._amounts[account] = amount
+            self._by_key[(cents, confusion_key(account))].add(account)
+            for variant in _deletion_variants(account):
+                self._by_variant[(cents, variant)].add(account)
+
+    def _candidates(self, account, amount):
+        cents = _cents(amount)
+        key = confusion_key(account)
+        variants = _deletion_variants(account)
+        candidates = set()
+        # Amounts within a cent can round to the neighbouring bucket
+        for bucket in (cents - 1, cents, cents + 1):
+            candidates |= self._by_key.get((bucket, key), set())
+            for variant in variants:
+                candidates |= self._by_variant.get((bucket, variant), set())
+        return candidates
+
+    def take(self, account, amount):
+        """
+        Returns the closest unclaimed Excel account for a PDF account/amount and
+        removes it from the index, or None. Ties go to the alphabetically first
+        account, so the outcome doesn't depend on dict or set order.
+        """
+        best = None
+        for candidate in self._candidates(account, amount):
+            if candidate not in self._amounts or abs(self._amounts[candidate] - amount) >= 0.01:
+                continue
+            if account_distance(account, candidate, MAX_EDITS, confusable_cost=1.0) > MAX_EDITS:
+                continue
+            distance = account_distance(account, candidate)
+            if distance <= MAX_DISTANCE and (best is None or (distance, candidate) < best):
+                best = (distance, candidate)
+        if best is None:
+            return None
+        del self._amounts[best[1]]  # claimed; stale bucket entries are skipped above
+        return best[1]
@@ -0,0 +1,49 @@
+"""
+Measures OCR throughput (pages/sec) of ocr_engine.iter_pdf_pages for 1 to N
+worker processes and checks every run gives the same text as the serial one.
+
+    python benchmarks/bench_ocr_workers.py statement.pdf --max-workers 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_engine  # noqa: E402
+
+
+def run_once(pdf_path, workers):
+    start = time.perf_counter()
+    # Timings differ from run to run, so only the extracted text is compared
+    pages = [(page.page_number, page.text, page.source) for page in ocr_engine.iter_pdf_pages(pdf_path, workers=workers)]
+    elapsed = time.perf_counter() - start
+    return pages, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF OCR.")
+    parser.add_argument("pdf", help="PDF file to OCR")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="largest worker count to try (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    page_count = ocr_engine.get_page_count(args.pdf)
+    print(f"{os.path.basename(args.pdf)}: {page_count} pages")
+    print(f"{'workers':>7}  {'seconds':>8}  {'pages/sec':>9}  {'speedup':>7}")
+
+    baseline_pages, baseline_time = None, None
+    for workers in range(1, args.max_workers + 1):
+        pages, elapsed = run_once(args.pdf, workers)
+        if baseline_pages is None:
+            baseline_pages, baseline_time = pages, elapsed
+        elif pages != baseline_pages:
+            print(f"ERROR: output with {workers} workers differs from the serial run", file=sys.stderr)
+            return 1
+        print(f"{workers:>7}  {elapsed:>8.2f}  {page_count / elapsed:>9.2f}  {baseline_time / elapsed:>6.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
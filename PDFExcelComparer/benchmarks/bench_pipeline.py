@@ -0,0 +1,140 @@
+"""
+End-to-end benchmark of the comparer on synthetic statements and exports.
+
+For every combination of page count, export size, statement kind and export
+format it generates the files (see synthetic_data.py), runs
+comparer_core.compare_files with a RunProfiler, prints the time per stage and
+the throughput, and checks the reconciliation against the known answer.
+"digital" statements have a text layer; "scanned" ones are page images that
+go through Tesseract.
+
+    python benchmarks/bench_pipeline.py --pages 10 100 --rows 1000 100000
+    python benchmarks/bench_pipeline.py --pages 10000 --rows 1000000 --kinds digital --formats csv
+    python benchmarks/bench_pipeline.py --kinds scanned --tesseract /usr/bin/tesseract
+
+Everything runs offline. Tesseract is taken from --tesseract, the
+TESSERACT_CMD environment variable or PATH. The same --seed always produces
+the same files.
+
+Exit status is 1 when a run fails or a digital run reports wrong results.
+Wrong results of scanned runs are only reported, since real OCR errors are
+part of what they measure.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import comparer_core  # noqa: E402
+import ocr_engine  # noqa: E402
+import synthetic_data  # noqa: E402
+from ocr_cache import OCRCache  # noqa: E402
+from run_profiler import RunProfiler  # noqa: E402
+
+KIND_DIGITAL = "digital"
+KIND_SCANNED = "scanned"
+
+
+def run_scenario(pdf_path, export_path, ledger, args):
+    profiler = RunProfiler()
+    summary = comparer_core.compare_files(
+        pdf_path, export_path,
+        workers=args.workers,
+        use_text_layer=True,
+        cache=OCRCache(args.cache_dir) if args.cache_dir else None,
+        profiler=profiler,
+    )
+    correct, expected, wrong = synthetic_data.check_results(summary["results"], ledger)
+    return profiler, correct, expected, wrong
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the whole comparison on synthetic data.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100], help="statement sizes in pages (default: 10 100)")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="export sizes in rows (default: 1000 100000)")
+    parser.add_argument("--kinds", nargs="+", choices=[KIND_DIGITAL, KIND_SCANNED], default=[KIND_DIGITAL, KIND_SCANNED])
+    parser.add_argument("--formats", nargs="+", choices=["xlsx", "csv"], default=["xlsx"])
+    parser.add_argument("--workers", type=int, default=ocr_engine.DEFAULT_OCR_WORKERS, help="OCR worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corruption", type=float, default=1.0,
+                        help="scales the share of damaged accounts in synthetic_data.DEFAULT_CORRUPTION (0 for clean data)")
+    parser.add_argument("--tesseract", help="path to the tesseract executable")
+    parser.add_argument("--cache-dir", help="use an OCR cache in this folder (default: always OCR)")
+    parser.add_argument("--out", help="keep the generated files in this folder (default: a temporary folder)")
+    parser.add_argument("--json", dest="json_path", help="write every run's timings and results to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the stage timings of each run")
+    args = parser.parse_args(argv)
+
+    if args.tesseract:
+        ocr_engine.set_tesseract_cmd(args.tesseract)
+    corruption = {damage: rate * args.corruption for damage, rate in synthetic_data.DEFAULT_CORRUPTION.items()}
+
+    # Files in --out are reused by later runs, so their names carry everything they are generated from
+    variant = f"s{args.seed}-c{args.corruption:g}"
+    out_dir = args.out or tempfile.mkdtemp(prefix="comparer-bench-")
+    os.makedirs(out_dir, exist_ok=True)
+
+    print(f"{'kind':<8} {'format':<6} {'pages':>6} {'rows':>9}  {'gen s':>7}  {'run s':>7}  {'pages/s':>8}  {'rows/s':>9}  correct")
+    runs = []
+    failed = False
+    try:
+        for page_count in args.pages:
+            ledger = synthetic_data.build_ledger(page_count, seed=args.seed, corruption=corruption)
+            for row_count in args.rows:
+                rows = synthetic_data.export_rows(ledger, row_count, seed=args.seed)
+                for export_format in args.formats:
+                    started = time.perf_counter()
+                    export_path = os.path.join(out_dir, f"export-{page_count}p-{row_count}r-{variant}.{export_format}")
+                    if not os.path.exists(export_path):
+                        synthetic_data.write_export(export_path, rows)
+                    export_seconds = time.perf_counter() - started
+
+                    for kind in args.kinds:
+                        started = time.perf_counter()
+                        pdf_path = os.path.join(out_dir, f"statement-{page_count}p-{kind}-{variant}.pdf")
+                        if not os.path.exists(pdf_path):
+                            synthetic_data.write_statement_pdf(pdf_path, ledger, rasterize=kind == KIND_SCANNED)
+                        generate_seconds = export_seconds + time.perf_counter() - started
+
+                        try:
+                            profiler, correct, expected, wrong = run_scenario(pdf_path, export_path, ledger, args)
+                        except Exception as e:
+                            # Report it and go on with the other scenarios; the exit status shows the failure
+                            print(f"{kind:<8} {export_format:<6} {page_count:>6} {len(rows):>9}  {generate_seconds:>7.2f}  "
+                                  f"FAILED: {type(e).__name__}: {e}")
+                            failed = True
+                            continue
+                        if wrong and kind == KIND_DIGITAL:
+                            failed = True
+                        print(f"{kind:<8} {export_format:<6} {page_count:>6} {len(rows):>9}  {generate_seconds:>7.2f}  {profiler.wall:>7.2f}  "
+                              f"{page_count / profiler.wall:>8.1f}  {len(rows) / profiler.wall:>9.0f}  {correct}/{expected}")
+                        if args.verbose:
+                            print("\n".join(profiler.summary_lines()))
+                            for result in wrong[:10]:
+                                print(f"  unexpected or missing: {result}")
+                        runs.append({
+                            "kind": kind,
+                            "format": export_format,
+                            "pages": page_count,
+                            "rows": len(rows),
+                            "correct": correct,
+                            "expected": expected,
+                            "timings": profiler.to_dict(),
+                        })
+    finally:
+        if not args.out:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"seed": args.seed, "runs": runs}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
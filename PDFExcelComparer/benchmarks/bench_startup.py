@@ -0,0 +1,100 @@
+"""
+Measures time-to-first-window and time-to-first-result of the desktop app.
+
+Each run starts the app as a new process with the startup probe enabled
+(see comparer_app.STARTUP_PROBE_ENV). The app notes when its window has been
+drawn, compares a small synthetic statement/export pair and closes. Times are
+taken from the moment the process is launched, so they include the bootloader
+unpacking a one-file build.
+
+The statement is a scan, so the first result includes running Tesseract. Every
+launch gets its own empty cache folder (through XDG_CACHE_HOME and
+LOCALAPPDATA), so no run reads pages from the OCR cache or checkpoints of an
+earlier one, and the user's own cache is left alone.
+
+    python benchmarks/bench_startup.py                                   # python comparer_app.py
+    python benchmarks/bench_startup.py --exe dist/PDFExcelComparer.exe   # one-file build
+    python benchmarks/bench_startup.py --exe dist/PDFExcelComparer/PDFExcelComparer.exe --runs 10
+
+Run it against builds before and after a change to compare them. Needs a
+display (use xvfb-run on a headless Linux box).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import synthetic_data  # noqa: E402
+from comparer_app import PROBE_EXCEL_ENV, PROBE_PDF_ENV, STARTUP_PROBE_ENV  # noqa: E402
+
+PROBE_TIMEOUT_SECONDS = 300
+
+
+def launch_once(command, probe_path, cache_dir, pair=None):
+    """Starts the app with its caches in cache_dir and returns {milestone: seconds after launch}."""
+    if os.path.exists(probe_path):
+        os.remove(probe_path)
+    os.makedirs(cache_dir)
+    # The OCR cache and the page checkpoints both live under these folders
+    env = dict(os.environ, **{STARTUP_PROBE_ENV: probe_path, "XDG_CACHE_HOME": cache_dir, "LOCALAPPDATA": cache_dir})
+    if pair is not None:
+        env[PROBE_PDF_ENV], env[PROBE_EXCEL_ENV] = pair
+    else:
+        env.pop(PROBE_PDF_ENV, None)
+        env.pop(PROBE_EXCEL_ENV, None)
+
+    launched = time.time()
+    subprocess.run(command, env=env, cwd=APP_DIR, timeout=PROBE_TIMEOUT_SECONDS, check=False)
+    milestones = {}
+    if os.path.exists(probe_path):
+        with open(probe_path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, stamp = line.split()
+                milestones[name] = float(stamp) - launched
+    return milestones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark desktop app startup.")
+    parser.add_argument("--exe", help="bundled executable to launch (default: python comparer_app.py)")
+    parser.add_argument("--runs", type=int, default=5, help="launches per measurement (default: 5)")
+    parser.add_argument("--pages", type=int, default=2, help="pages in the synthetic statement (default: 2)")
+    args = parser.parse_args(argv)
+
+    command = [args.exe] if args.exe else [sys.executable, os.path.join(APP_DIR, "comparer_app.py")]
+
+    with tempfile.TemporaryDirectory(prefix="comparer-startup-") as work_dir:
+        ledger = synthetic_data.build_ledger(args.pages)
+        pdf_path = os.path.join(work_dir, "statement.pdf")
+        excel_path = os.path.join(work_dir, "export.xlsx")
+        synthetic_data.write_statement_pdf(pdf_path, ledger, rasterize=True)
+        synthetic_data.write_export(excel_path, synthetic_data.export_rows(ledger, len(ledger.accounts) * 2))
+        probe_path = os.path.join(work_dir, "probe.txt")
+
+        windows, results = [], []
+        for run in range(args.runs):
+            milestones = launch_once(command, probe_path, os.path.join(work_dir, f"cache-{run}-window"))
+            if "window" not in milestones:
+                print("ERROR: the app never reported its window; is there a display?", file=sys.stderr)
+                return 1
+            windows.append(milestones["window"])
+            milestones = launch_once(command, probe_path, os.path.join(work_dir, f"cache-{run}-result"), pair=(pdf_path, excel_path))
+            if "result" not in milestones:
+                print(f"ERROR: no result from the app (milestones: {milestones})", file=sys.stderr)
+                return 1
+            results.append(milestones["result"])
+
+    print(f"{' '.join(command)}")
+    print(f"time to first window: median {statistics.median(windows):.2f} s, min {min(windows):.2f} s over {len(windows)} runs")
+    print(f"time to first result: median {statistics.median(results):.2f} s, min {min(results):.2f} s over {len(results)} runs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
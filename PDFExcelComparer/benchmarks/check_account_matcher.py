@@ -0,0 +1,54 @@
+"""
+Regression check for approximate account matching.
+
+A PDF account that isn't in the export may only be paired with an Excel
+account one edit away. Accounts two edits apart are different accounts, even
+when both edits swap digits Tesseract confuses (W1234567 and W7284567).
+
+    python benchmarks/check_account_matcher.py
+
+Exit status is 1 when a check fails.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_matcher import AccountIndex  # noqa: E402
+
+# (PDF account, Excel account, whether they should be paired)
+CASES = [
+    ("W1234567", "W1234567", True),    # same account
+    ("W1234567", "W1284567", True),    # one confusable digit (3/8)
+    ("W1234567", "W1254567", True),    # one other digit
+    ("W1234567", "W123456", True),     # a digit dropped
+    ("W123456", "W1234567", True),     # a digit added
+    ("W1234567", "W1243567", True),    # two neighbouring digits swapped
+    ("W1234567", "W7284567", False),   # two confusable digits (1/7, 3/8)
+    ("W1234567", "W1284561", False),   # two confusable digits (3/8, 7/1)
+    ("W1234567", "W1285567", False),   # a confusable digit and another one
+    ("W1234567", "W1243568", False),   # a swap and another digit
+    ("W1234567", "W124568", False),    # a digit dropped and another one changed
+]
+
+
+def main(argv=None):
+    failed = False
+    for pdf_account, excel_account, should_pair in CASES:
+        paired = AccountIndex({excel_account: 10.0}).take(pdf_account, 10.0) == excel_account
+        if paired != should_pair:
+            failed = True
+            print(f"FAILED: {pdf_account} and {excel_account} were {'' if paired else 'not '}paired")
+
+    # With several candidates, a confusable digit beats any other edit
+    preferred = AccountIndex({"W1254567": 10.0, "W1284567": 10.0}).take("W1234567", 10.0)
+    if preferred != "W1284567":
+        failed = True
+        print(f"FAILED: W1234567 was paired with {preferred} instead of W1284567")
+
+    print("FAILED" if failed else "ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Regression check for resuming from page checkpoints.
+
+Writes a synthetic statement, and a copy of it whose pages only draw a Form
+XObject holding the original page (what page.show_pdf_page and many PDF
+tools produce), so every page has the same content stream "q /fzFrm0 Do Q".
+For both it checks that no two pages share a fingerprint and that a second,
+checkpointed run resumes every page and reports the same results as the
+first.
+
+    python benchmarks/check_checkpoints.py
+    python benchmarks/check_checkpoints.py --pages 20 --kinds digital scanned
+
+Exit status is 1 when a check fails.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+
+import comparer_core  # noqa: E402
+import ocr_engine  # noqa: E402
+import synthetic_data  # noqa: E402
+from page_checkpoints import PageCheckpoints, page_fingerprint  # noqa: E402
+
+
+def write_form_xobject_copy(source_path, path):
+    """Copies a PDF so that each page only shows the original page as a Form XObject."""
+    with fitz.open(source_path) as source:
+        copy = fitz.open()
+        for page in source:
+            new_page = copy.new_page(width=page.rect.width, height=page.rect.height)
+            new_page.show_pdf_page(new_page.rect, source, page.number)
+        copy.save(path, garbage=3, deflate=True)
+        copy.close()
+
+
+def run(pdf_path, export_path, checkpoint_dir):
+    """Returns (results, Counter of page sources) of one checkpointed comparison."""
+    sources = Counter()
+    summary = comparer_core.compare_files(
+        pdf_path, export_path,
+        workers=1,
+        checkpoints=PageCheckpoints(checkpoint_dir),
+        on_page=lambda page_number, page_count, source: sources.update([source]),
+    )
+    return summary["results"], sources
+
+
+def check(pdf_path, export_path, ledger, work_dir):
+    """Returns a list of failure messages for one statement."""
+    failures = []
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        fingerprints = [page_fingerprint(doc, page) for page in doc]
+    if len(set(fingerprints)) != page_count:
+        failures.append(f"{page_count - len(set(fingerprints))} page(s) share a fingerprint with another page")
+
+    checkpoint_dir = tempfile.mkdtemp(prefix="checkpoints-", dir=work_dir)
+    first, _ = run(pdf_path, export_path, checkpoint_dir)
+    second, sources = run(pdf_path, export_path, checkpoint_dir)
+    if sources[ocr_engine.SOURCE_CHECKPOINT] != page_count:
+        failures.append(f"resumed {sources[ocr_engine.SOURCE_CHECKPOINT]} of {page_count} pages from checkpoints")
+    if second != first:
+        failures.append("the resumed run reported different results than the first run")
+    correct, expected, _ = synthetic_data.check_results(second, ledger)
+    if correct != expected:
+        failures.append(f"the resumed run got {correct}/{expected} results right")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that checkpointed runs resume correctly.")
+    parser.add_argument("--pages", type=int, default=3, help="pages in the synthetic statement (default: 3)")
+    parser.add_argument("--kinds", nargs="+", choices=["digital", "scanned"], default=["digital"])
+    parser.add_argument("--tesseract", help="path to the tesseract executable (for scanned statements)")
+    args = parser.parse_args(argv)
+
+    if args.tesseract:
+        ocr_engine.set_tesseract_cmd(args.tesseract)
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="comparer-checkpoints-") as work_dir:
+        ledger = synthetic_data.build_ledger(args.pages)
+        export_path = os.path.join(work_dir, "export.xlsx")
+        synthetic_data.write_export(export_path, synthetic_data.export_rows(ledger, len(ledger.accounts) * 2))
+        for kind in args.kinds:
+            pdf_path = os.path.join(work_dir, f"statement-{kind}.pdf")
+            synthetic_data.write_statement_pdf(pdf_path, ledger, rasterize=kind == "scanned")
+            form_path = os.path.join(work_dir, f"statement-{kind}-forms.pdf")
+            write_form_xobject_copy(pdf_path, form_path)
+
+            for name, path in ((kind, pdf_path), (f"{kind}, Form XObject pages", form_path)):
+                failures = check(path, export_path, ledger, work_dir)
+                print(f"{name}: {'ok' if not failures else 'FAILED'}")
+                for failure in failures:
+                    print(f"  {failure}")
+                failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
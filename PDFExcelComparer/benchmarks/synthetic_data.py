@@ -0,0 +1,236 @@
+"""
+Synthetic statements and processor exports for the benchmarks.
+
+build_ledger() makes a random but reproducible set of accounts and payments,
+with a controlled share of OCR-style damage in the statement (look-alike
+letters, confusable digits) and of real discrepancies (wrong totals, accounts
+on only one side). write_statement_pdf() writes the statement either
+born-digital or as page images, write_export() writes the matching export as
+xlsx or CSV, and check_results() compares a compare_data result list with
+what it should have reported.
+"""
+import csv
+import random
+from collections import Counter, namedtuple
+
+import fitz
+from openpyxl import Workbook
+
+import comparer_core
+
+# Payment kind -> how the statement prints its description
+PAYMENT_DESCRIPTIONS = {
+    "ELF PAY": "ELF PAY AU",
+    "XXDELETE FROM BAT": "XXDELETE FROM BAT",
+    "CARD PAYME": "CARD PAYME",
+}
+
+LINES_PER_PAGE = 50
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter in points
+
+# Share of accounts given each kind of damage or discrepancy
+DEFAULT_CORRUPTION = {
+    "misread": 0.05,           # a digit printed as a look-alike letter (W12O4567); the scanner fixes it
+    "confusable": 0.02,        # a digit swapped for a confusable one (W1284567); matched approximately
+    "amount": 0.02,            # the export total is off
+    "missing_in_excel": 0.01,  # the account isn't in the export
+    "missing_in_pdf": 0.01,    # extra accounts that are only in the export
+}
+
+# Share of export rows without an account number, which the loader skips
+INVALID_ROW_RATE = 0.001
+
+MISREAD_LETTERS = {"0": "O", "1": "I", "5": "S", "8": "B"}
+CONFUSABLE_DIGITS = {"0": "6", "3": "8", "6": "0", "8": "3", "1": "7", "7": "1"}
+
+NAMES = ["SMITH J", "GARCIA M", "NGUYEN T", "PATEL R", "MUELLER K", "OKAFOR C", "ROSSI L", "TANAKA Y", "COHEN D", "SILVA A"]
+
+# account is the real account number and pdf_account how the statement prints
+# it. payments is a list of (kind, cents), empty for accounts that are only in
+# the export; excel_cents is None for accounts missing from the export.
+LedgerAccount = namedtuple("LedgerAccount", ["account", "pdf_account", "payments", "excel_cents", "damage"])
+Ledger = namedtuple("Ledger", ["accounts", "statement_lines"])
+
+
+def _new_account(rng, used):
+    while True:
+        account = f"W{rng.randrange(1_000_000, 10_000_000)}"
+        if account not in used:
+            used.add(account)
+            return account
+
+
+def _replace_digit(rng, account, table, used=None):
+    # Swaps one digit for table[digit]; None if the account has no such digit
+    # or the result would collide with another account
+    positions = [i for i in range(1, len(account)) if account[i] in table]
+    if not positions:
+        return None
+    i = rng.choice(positions)
+    changed = account[:i] + table[account[i]] + account[i + 1:]
+    if used is not None:
+        if changed in used:
+            return None
+        used.add(changed)
+    return changed
+
+
+def _pick_damage(rng, corruption):
+    roll = rng.random()
+    for damage in ("misread", "confusable", "amount", "missing_in_excel"):
+        rate = corruption.get(damage, 0.0)
+        if roll < rate:
+            return damage
+        roll -= rate
+    return None
+
+
+def _account_lines(rng, entry):
+    lines = [f"{entry.pdf_account}  {rng.choice(NAMES)}"]
+    if rng.random() < 0.3:
+        lines.append(f"    BALANCE FORWARD          {rng.randrange(0, 500_000) / 100:,.2f}")
+    for kind, cents in entry.payments:
+        lines.append(f"    {rng.randrange(1, 13):02d}/{rng.randrange(1, 29):02d}  {PAYMENT_DESCRIPTIONS[kind]:<20} {cents / 100:.2f}")
+    return lines
+
+
+def build_ledger(page_count, seed=0, corruption=DEFAULT_CORRUPTION):
+    """Accounts and statement lines filling page_count pages of LINES_PER_PAGE lines."""
+    rng = random.Random(seed)
+    used = set()
+    accounts = []
+    lines = []
+    capacity = page_count * LINES_PER_PAGE
+
+    while True:
+        account = _new_account(rng, used)
+        payments = [(rng.choice(list(PAYMENT_DESCRIPTIONS)), rng.randrange(1_000, 100_000)) for _ in range(rng.randint(1, 3))]
+        total = sum(cents for _, cents in payments)
+        damage = _pick_damage(rng, corruption)
+
+        pdf_account, excel_cents = account, total
+        if damage == "misread":
+            pdf_account = _replace_digit(rng, account, MISREAD_LETTERS)
+        elif damage == "confusable":
+            pdf_account = _replace_digit(rng, account, CONFUSABLE_DIGITS, used)
+        elif damage == "amount":
+            excel_cents = total + rng.choice((-1, 1)) * rng.randrange(100, 5_000)
+        elif damage == "missing_in_excel":
+            excel_cents = None
+        if pdf_account is None:
+            # No digit to damage; keep the account clean
+            pdf_account, damage = account, None
+
+        entry = LedgerAccount(account, pdf_account, payments, excel_cents, damage)
+        entry_lines = _account_lines(rng, entry)
+        if len(lines) + len(entry_lines) > capacity:
+            break
+        accounts.append(entry)
+        lines.extend(entry_lines)
+
+    lines.extend("" for _ in range(capacity - len(lines)))  # pad the last page
+
+    for _ in range(round(len(accounts) * corruption.get("missing_in_pdf", 0.0))):
+        accounts.append(LedgerAccount(_new_account(rng, used), None, [], rng.randrange(1_000, 300_000), "missing_in_pdf"))
+    return Ledger(accounts, lines)
+
+
+def write_statement_pdf(path, ledger, rasterize=False, dpi=150):
+    """
+    Writes the statement with a text layer, or with rasterize as grayscale
+    page images only (like a scan), so every page has to be OCR'd.
+    """
+    doc = fitz.open()
+    lines = ledger.statement_lines
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((36, 40), f"STATEMENT OF ACCOUNT    PAGE {start // LINES_PER_PAGE + 1}", fontname="cour", fontsize=10)
+        for i, line in enumerate(lines[start:start + LINES_PER_PAGE]):
+            if line:
+                page.insert_text((36, 64 + i * 14), line, fontname="cour", fontsize=10)
+
+    if rasterize:
+        scanned = fitz.open()
+        for page in doc:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            image_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+            image_page.insert_image(image_page.rect, pixmap=pix)
+        doc.close()
+        doc = scanned
+
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def _split(rng, cents, parts):
+    # Random non-negative row amounts adding up to cents
+    cuts = sorted(rng.randint(0, cents) for _ in range(parts - 1))
+    return [b - a for a, b in zip([0] + cuts, cuts + [cents])]
+
+
+def export_rows(ledger, row_count, seed=0):
+    """
+    Yields (account column, amount) rows, in random order, whose per-account
+    totals are the ledger's export totals; each account gets at least one row.
+    """
+    rng = random.Random(seed)
+    exported = [entry for entry in ledger.accounts if entry.excel_cents is not None]
+    invalid_count = int(row_count * INVALID_ROW_RATE)
+    per_account, extra = divmod(max(row_count - invalid_count, len(exported)), len(exported))
+
+    rows = []
+    for index, entry in enumerate(exported):
+        parts = per_account + (1 if index < extra else 0)
+        for cents in _split(rng, abs(entry.excel_cents), parts):
+            label = entry.account if rng.random() < 0.9 else f"{entry.account} / WEB"
+            rows.append((label, (cents if entry.excel_cents >= 0 else -cents) / 100))
+    rows.extend(("", rng.randrange(100, 10_000) / 100) for _ in range(invalid_count))
+    rng.shuffle(rows)
+    return rows
+
+
+def write_export(path, rows):
+    """Writes the rows as an xlsx workbook, or as CSV when path ends in .csv."""
+    header = [comparer_core.ACCOUNT_COLUMN, comparer_core.AMOUNT_COLUMN]
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows((label, f"{amount:.2f}") for label, amount in rows)
+        return
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transactions")
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def expected_results(ledger):
+    """Counter of the (account, excel_account, status, match_type) results compare_data should give."""
+    expected = Counter()
+    for entry in ledger.accounts:
+        if entry.damage == "missing_in_pdf":
+            expected[(None, entry.account, comparer_core.STATUS_MISSING_IN_PDF, None)] += 1
+        elif entry.damage == "missing_in_excel":
+            expected[(entry.account, None, comparer_core.STATUS_MISSING_IN_EXCEL, None)] += 1
+        elif entry.damage == "confusable":
+            expected[(entry.pdf_account, entry.account, comparer_core.STATUS_MATCH, comparer_core.MATCH_APPROXIMATE)] += 1
+        elif entry.damage == "amount":
+            expected[(entry.account, entry.account, comparer_core.STATUS_AMOUNT_MISMATCH, comparer_core.MATCH_EXACT)] += 1
+        else:
+            expected[(entry.account, entry.account, comparer_core.STATUS_MATCH, comparer_core.MATCH_EXACT)] += 1
+    return expected
+
+
+def check_results(results, ledger):
+    """
+    Returns (correct, expected_count, wrong) where wrong lists the expected
+    results that are missing followed by the reported ones nobody expected.
+    """
+    expected = expected_results(ledger)
+    actual = Counter((r["account"], r["excel_account"], r["status"], r["match_type"]) for r in results)
+    correct = sum((expected & actual).values())
+    wrong = list((expected - actual).elements()) + list((actual - expected).elements())
+    return correct, sum(expected.values()), wrong
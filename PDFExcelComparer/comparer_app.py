@@ -1,23 +1,48 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-import pandas as pd
-from PIL import Image 
-import pytesseract
-import re
+from tkinter import filedialog, messagebox, scrolledtext, ttk
 import os
-import sys 
-import fitz 
-import io
-from collections import defaultdict 
+import time
+import queue
+import threading
+import multiprocessing
+
+import ocr_settings
+from ocr_cache import OCRCache
+from page_checkpoints import PageCheckpoints
+from results_view import ResultsView
+from run_profiler import RunProfiler
+
+# How often (ms) the window drains the worker's event queue
+POLL_INTERVAL_MS = 100
+
+# The pipeline (pandas, PyMuPDF, PIL, pytesseract) takes seconds to import, so
+# it is loaded by load_pipeline() in the background once the window is up
+PRELOAD_DELAY_MS = 500
+pd = pytesseract = comparer_core = ComparisonCancelled = None
+_pipeline_lock = threading.Lock()
+
+# Set by benchmarks/bench_startup.py: the app appends "<milestone> <time.time()>"
+# lines ("window", then "result" if a PDF/Excel pair is given) to this file and closes
+STARTUP_PROBE_ENV = "PDFEXCEL_STARTUP_PROBE"
+PROBE_PDF_ENV = "PDFEXCEL_PROBE_PDF"
+PROBE_EXCEL_ENV = "PDFEXCEL_PROBE_EXCEL"
+
+
+def load_pipeline():
+    """Imports the comparison pipeline if it isn't loaded yet. Safe to call from any thread."""
+    global pd, pytesseract, ComparisonCancelled, comparer_core
+    with _pipeline_lock:
+        if comparer_core is not None:
+            return
+        import pandas as pd
+        import pytesseract
+        from comparer_core import ComparisonCancelled
+        import comparer_core  # last, since it marks the pipeline as loaded
+
 
-if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-    # PyInstaller bundle path 
-    tesseract_bundle_dir = os.path.join(sys._MEIPASS, "Tesseract-OCR")
-    pytesseract.pytesseract.tesseract_cmd = os.path.join(tesseract_bundle_dir, "tesseract.exe")
-    os.environ['TESSDATA_PREFIX'] = os.path.join(tesseract_bundle_dir, "tessdata")
-else:
-    # development path
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+def _probe_milestone(name):
+    with open(os.environ[STARTUP_PROBE_ENV], "a", encoding="utf-8") as f:
+        f.write(f"{name} {time.time()}\n")
 
 
 class PDFExcelComparerApp:
@@ -78,15 +103,64 @@ class PDFExcelComparerApp:
         excel_button.grid(row=1, column=2, sticky="ew", padx=5, pady=5)
         self.apply_button_style(excel_button)
 
-        # Run Comparison Button
-        run_button = tk.Button(self.main_frame, text="Run Comparison", command=self.run_comparison, font=("Inter", 14, "bold"), bg="#22C55E", fg="white", activebackground="#16A34A", activeforeground="white", relief="raised", bd=0, padx=20, pady=10)
-        run_button.grid(row=1, column=0, columnspan=2, pady=15) 
-        self.apply_button_style(run_button)
+        # Number of worker processes used for OCR
+        tk.Label(input_frame, text="OCR Workers:", font=("Inter", 12, "bold"), bg="#F0F4F8", fg="#334155").grid(row=2, column=0, sticky="w", pady=5)
+        self.ocr_workers = tk.IntVar(value=ocr_settings.DEFAULT_OCR_WORKERS)
+        self.workers_spinbox = tk.Spinbox(input_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.ocr_workers, width=5, font=("Inter", 10), relief="flat", highlightbackground="#D1D5DB", highlightcolor="#4F46E5", highlightthickness=1, fg="#334155")
+        self.workers_spinbox.grid(row=2, column=1, sticky="w", padx=5, pady=5)
+
+        # Read born-digital pages from their text layer instead of OCR'ing them
+        self.use_text_layer = tk.BooleanVar(value=True)
+        tk.Checkbutton(input_frame, text="Use PDF text layer when available", variable=self.use_text_layer, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=3, column=1, sticky="w", padx=5, pady=0)
+
+        # Reuse OCR output for pages that were already processed in an earlier run
+        self.use_ocr_cache = tk.BooleanVar(value=True)
+        tk.Checkbutton(input_frame, text="Cache OCR results between runs", variable=self.use_ocr_cache, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=4, column=1, sticky="w", padx=5, pady=0)
+
+        # Restrict Tesseract to the characters that appear in account and payment lines
+        self.ledger_whitelist = tk.BooleanVar(value=False)
+        tk.Checkbutton(input_frame, text="OCR ledger characters only (faster, ignores other text)", variable=self.ledger_whitelist, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=5, column=1, sticky="w", padx=5, pady=0)
+
+        self.adaptive_dpi = tk.BooleanVar(value=False)
+        tk.Checkbutton(input_frame, text=f"Adaptive DPI (re-OCR unclear pages at {ocr_settings.RETRY_DPI} DPI)", variable=self.adaptive_dpi, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=6, column=1, sticky="w", padx=5, pady=0)
+
+        self.timing_report = tk.BooleanVar(value=False)
+        tk.Checkbutton(input_frame, text="Timing report (time and memory per stage and page)", variable=self.timing_report, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=7, column=1, sticky="w", padx=5, pady=0)
+
+        self.save_trace = tk.BooleanVar(value=False)
+        tk.Checkbutton(input_frame, text="Save JSON trace and cProfile dump", variable=self.save_trace, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=8, column=1, sticky="w", padx=5, pady=0)
+
+        self.use_checkpoints = tk.BooleanVar(value=True)
+        tk.Checkbutton(input_frame, text="Resume interrupted runs (save each finished page)", variable=self.use_checkpoints, font=("Inter", 10), bg="#F0F4F8", fg="#334155", activebackground="#F0F4F8", selectcolor="white").grid(row=9, column=1, sticky="w", padx=5, pady=0)
+
+        # Run Comparison and Cancel Buttons
+        self.run_button = tk.Button(self.main_frame, text="Run Comparison", command=self.run_comparison, font=("Inter", 14, "bold"), bg="#22C55E", fg="white", activebackground="#16A34A", activeforeground="white", relief="raised", bd=0, padx=20, pady=10)
+        self.run_button.grid(row=1, column=0, sticky="e", padx=5, pady=15) 
+        self.apply_button_style(self.run_button)
+
+        self.cancel_button = tk.Button(self.main_frame, text="Cancel", command=self.cancel_comparison, font=("Inter", 14, "bold"), bg="#EF4444", fg="white", activebackground="#DC2626", activeforeground="white", relief="raised", bd=0, padx=20, pady=10, state=tk.DISABLED)
+        self.cancel_button.grid(row=1, column=1, sticky="w", padx=5, pady=15) 
+        self.apply_button_style(self.cancel_button)
 
         # Results Display Area
-        tk.Label(self.main_frame, text="Comparison Results:", font=("Inter", 12, "bold"), bg="#F0F4F8", fg="#334155").grid(row=2, column=0, columnspan=2, sticky="nw", padx=0, pady=5) 
-        self.results_text = scrolledtext.ScrolledText(self.main_frame, wrap=tk.WORD, font=("Inter", 10), bg="white", fg="#334155", bd=1, relief="solid", highlightbackground="#CBD5E1", highlightthickness=1, borderwidth=1, padx=10, pady=10)
-        self.results_text.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=0, pady=10) 
+        tk.Label(self.main_frame, text="Comparison Results:", font=("Inter", 12, "bold"), bg="#F0F4F8", fg="#334155").grid(row=2, column=0, sticky="nw", padx=0, pady=5) 
+        self.status_text = tk.StringVar(value="Ready.")
+        tk.Label(self.main_frame, textvariable=self.status_text, font=("Inter", 10), bg="#F0F4F8", fg="#64748B").grid(row=2, column=1, sticky="ne", padx=0, pady=5) 
+        # Results table in one tab, the run log in the other
+        self.notebook = ttk.Notebook(self.main_frame)
+        self.notebook.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=0, pady=10)
+        self.results_view = ResultsView(self.notebook, bg="#F0F4F8", padx=5, pady=5)
+        self.notebook.add(self.results_view, text="Results")
+        self.results_text = scrolledtext.ScrolledText(self.notebook, wrap=tk.WORD, font=("Inter", 10), bg="white", fg="#334155", bd=1, relief="solid", highlightbackground="#CBD5E1", highlightthickness=1, borderwidth=1, padx=10, pady=10)
+        self.notebook.add(self.results_text, text="Log")
+
+        # The comparison runs on a worker thread; it only talks to the window through this queue
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker_thread = None
+        self.run_options = {}
+        self.run_started_at = None
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
 
     def apply_button_style(self, button):
@@ -114,243 +188,121 @@ class PDFExcelComparerApp:
     def browse_excel_file(self):
         """Opens a file dialog for Excel selection."""
         file_path = filedialog.askopenfilename(
-            filetypes=[("Excel files", "*.xlsx *.xls")],
+            filetypes=[("Excel or CSV exports", "*.xlsx *.xls *.csv *.csv.gz")],
             title="Select Excel File"
         )
         if file_path:
             self.excel_file_path.set(file_path)
 
-    # This method takes the input PDF document and turns it into a text file 
-    def _get_pdf_full_text(self, input_pdf_path):
-        
-        full_text = ""
-        try:
-            self.results_text.insert(tk.END, "Opening PDF for OCR...\n")
-            self.master.update_idletasks()
-            doc = fitz.open(input_pdf_path)
-            self.results_text.insert(tk.END, "PDF opened. Starting OCR...\n")
-            self.master.update_idletasks()
-            tesseract_config = '--oem 1 --psm 6' # '--oem 1 --psm 6' most accurate
-
-            for page_number in range(len(doc)):
-                self.results_text.insert(tk.END, f"Processing page {page_number + 1}...\n")
-                self.master.update_idletasks()
-                page = doc.load_page(page_number) 
-                pix = page.get_pixmap(dpi=200)  # 200 (best range)
-                img = Image.open(io.BytesIO(pix.tobytes("png")))
-                text = pytesseract.image_to_string(img, config=tesseract_config) # Run OCR with the pre-processed image
-
-                # Apply your common OCR fixes: 
-                text = text.replace('@', '0').replace('e', '0').replace('Q', '0').replace('O', '0')
-                text = text.replace('I', '1').replace('l', '1').replace('B', '8').replace('S', '5')
-                text = text.replace('*', '').replace('$', '').replace('\f', '').replace(':', '').replace('%','')
-
-                full_text += f"\n--- Page {page_number + 1} ---\n{text}\n"
-            
-            #DEBUG TEXT
-            #print(full_text)
-            self.results_text.insert(tk.END, "OCR complete. Text extracted from PDF.\n")
-            self.master.update_idletasks()
-            return full_text
-        except pytesseract.TesseractNotFoundError:
-            raise RuntimeError("Tesseract OCR engine not found. Ensure it's correctly bundled with the application.")
-        except Exception as e:
-            self.results_text.insert(tk.END, f"Error during PDF OCR: {e}\n")
-            raise
-    
-    # This method takes the input pdf.txt file and finds all account numbers with their associated payments 
-    def _get_info_from_pdf_text(self, pdf_full_text):
-        account_totals = defaultdict(float)
-        account_counts = defaultdict(int)
-        current_account = None
-
-        # Regex patterns 
-        account_pattern = re.compile(r'\bW\d{6,8}\b')
-    
-        # Specific payment patterns
-        elf_pay_pattern = re.compile(r'ELF PAY AU\s*(-?\s*\d+\s*\.\s*\d{2})')
-        delete_bat_pattern = re.compile(r'XXDELETE FR[O0]M [B8]AT\s*(-?\s*\d+\s*\.\s*\d{2})')
-        credit_card_pattern = re.compile(r'CARD PAYME\s*(-?\s*\d+\s*\.\s*\d{2})')
-
-        
-
-        self.results_text.insert(tk.END, "Extracting account and payment info from PDF text...\n")
-        self.master.update_idletasks()
-
-        lines = pdf_full_text.splitlines()
-
-        # (NEED TO FIX) payments from the same account can be on different pages 
-        for line in lines:
-            # --- DEBUGGING START ---
-            #self.results_text.insert(tk.END, f"\nProcessing line: '{line.strip()}'\n")
-            #self.results_text.insert(tk.END, f"Current Account before processing line: {current_account}\n")
-            # --- DEBUGGING END ---
-            # Look for an account number
-            account_match = account_pattern.search(line)
-            if account_match:
-                current_account = account_match.group()
-                # --- DEBUGGING START ---
-                #self.results_text.insert(tk.END, f"Account found: {current_account}\n")
-                # --- DEBUGGING END ---
-            
-             # Attempt to find payments using the specific patterns first
-            payments = []
-
-            match = elf_pay_pattern.search(line)
-            if match:
-                payments.append(match.group(1))
-                # --- DEBUGGING START ---
-                #self.results_text.insert(tk.END, f"ELF PAY match found: {match.group(1)}\n")
-                # --- DEBUGGING END ---
-
-            match = delete_bat_pattern.search(line)
-            if match:
-                payments.append(match.group(1))
-                # --- DEBUGGING START ---
-                #self.results_text.insert(tk.END, f"DELETE BAT match found: {match.group(1)}\n")
-                # --- DEBUGGING END ---
-
-            match = credit_card_pattern.search(line)
-            if match:
-                payments.append(match.group(1))
-                # --- DEBUGGING START ---
-                #self.results_text.insert(tk.END, f"CREDIT CARD match found: {match.group(1)}\n")
-                # --- DEBUGGING END ---
-            
-            # --- DEBUGGING START ---
-            #self.results_text.insert(tk.END, f"Payments collected for line: {payments}\n")
-            #self.results_text.insert(tk.END, f"Current Account before adding to total: {current_account}\n")
-            # --- DEBUGGING END ---
-
-            if payments and current_account:
-                for payment_str in payments:
-                    try:
-                        amount = float(payment_str.replace(" ", ""))
-                        account_totals[current_account] += amount
-                        account_counts[current_account] += 1
-                    except ValueError:
-                        self.results_text.insert(tk.END, f"Warning: Could not parse payment amount from '{payment_str}' for account {current_account}.\n")
-                        self.master.update_idletasks()
-
-        self.results_text.insert(tk.END, f"Extracted {len(account_totals)} unique accounts from PDF text.\n")
-        self.master.update_idletasks()
-
-        return account_totals
-
-    # This method takes the input .xlsx file and finds all account numbers with their associated payments 
-    def _get_info_from_xlsx_data(self, input_xlsx_path):
-        
-        self.results_text.insert(tk.END, "Reading data from Excel...\n")
-        self.master.update_idletasks()
-        
-        try:
-            df = pd.read_excel(input_xlsx_path, engine="openpyxl", dtype=str)
-        except Exception as e:
-            self.results_text.insert(tk.END, f"Error reading Excel file: {e}\n")
-            self.master.update_idletasks()
-            raise
-
-        # Validate required columns 
-        account_col = 'merchant_defined_field_1'
-        amount_col = 'amount'
+    # --- Worker thread <-> window communication ---
+    # Tk widgets must only be touched from the main thread, so the worker posts
+    # events and _poll_events applies them on the main thread.
 
-        if amount_col not in df.columns:
-            raise ValueError(f"Required column '{amount_col}' not found in Excel file '{input_xlsx_path}'.")
-        if account_col not in df.columns:
-            raise ValueError(f"Required column '{account_col}' not found in Excel file '{input_xlsx_path}'.")
+    def _log(self, message):
+        self.events.put(("log", message))
 
-        account_totals = defaultdict(float)
-        account_counts = defaultdict(int)
+    def _report_progress(self, done, total, started_at):
+        elapsed = time.perf_counter() - started_at
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else None
+        self.events.put(("progress", done, total, rate, eta))
 
-        # Account pattern 
-        account_pattern = re.compile(r'\bW\d{6,7}\b')
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise ComparisonCancelled()
 
-        for index, row in df.iterrows():
-            amount_cell = row[amount_col]
-            account_cell = row[account_col]
+    def _on_page(self, page_number, page_count, source):
+        self._report_progress(page_number + 1, page_count, self.run_started_at)
+        self._check_cancelled()
 
-            # Try to convert amount
+    def _poll_events(self):
+        # Gather all pending log lines into one insert, so thousands of warnings cost one redraw
+        log_lines = []
+        finished = None
+        while True:
             try:
-                amount = float(str(amount_cell).strip())
-            except (ValueError, TypeError):
-                self.results_text.insert(tk.END, f"Warning: Skipping row {index+2} due to invalid amount: '{amount_cell}'.\n")
-                continue # Skip rows with invalid amounts
-
-            # Extract account number from messy string
-            if isinstance(account_cell, str):
-                account_match = account_pattern.search(account_cell)
-                if account_match:
-                    account = account_match.group()
-                    account_totals[account] += amount
-                    account_counts[account] += 1
-                else:
-                    self.results_text.insert(tk.END, f"Warning: No valid account number (Wxxxxxx/Wxxxxxxx) found in '{account_cell}' for row {index+2}.\n")
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "log":
+                log_lines.append(event[1])
+            elif kind == "results":
+                self.results_view.set_results(event[1])
+            elif kind == "progress":
+                _, done, total, rate, eta = event
+                eta_text = f"{int(eta) // 60}:{int(eta) % 60:02d}" if eta is not None else "--:--"
+                self.status_text.set(f"Page {done}/{total} - {rate:.2f} pages/sec - ETA {eta_text}")
             else:
-                self.results_text.insert(tk.END, f"Warning: Account cell content is not a string for row {index+2}: '{account_cell}'.\n")
-
-        self.results_text.insert(tk.END, f"Extracted {len(account_totals)} unique accounts from Excel.\n")
-        self.master.update_idletasks()
-        return account_totals
-
-    # This method takes all records from _get_info_from_pdf_text and _get_info_from_xlsx_data and compares the data and prints the differences 
-    def _compare_data(self, pdf_data, excel_data):
-        
-        self.results_text.insert(tk.END, "Comparing data...\n\n")
-        self.master.update_idletasks()
-
-        output_lines = []
-        matched_accounts = set()
-
-        import difflib 
-
-        # Compare PDF data against Excel data
-        for pdf_acc, pdf_amt in pdf_data.items():
-            if pdf_acc in excel_data:
-                excel_amt = excel_data[pdf_acc]
-                if abs(pdf_amt - excel_amt) < 0.01: # Check if difference is less than 1 cent
-                    output_lines.append(f"✅ Account {pdf_acc} matches: ${pdf_amt:.2f} in both files.\n")
-                else:
-                    output_lines.append(f"⚠️ Mismatch payment for account {pdf_acc}: PDF = ${pdf_amt:.2f}, Excel = ${excel_amt:.2f}\n")
-                    output_lines.append(f"    Check PDF and Excel with account number...\n")
-                matched_accounts.add(pdf_acc)
-            else:
-                # Try fuzzy matching only on unmatched Excel accounts for same amount
-                possible_matches = [
-                    acc for acc in excel_data if acc not in matched_accounts and abs(excel_data[acc] - pdf_amt) < 0.01
-                ]
-                # Using a higher cutoff for closer matches
-                close_matches = difflib.get_close_matches(pdf_acc, possible_matches, n=1, cutoff=0.83)
-                if close_matches:
-                    match = close_matches[0]
-                    output_lines.append(f"✅ Approximate match: PDF account {pdf_acc} ≈ Excel account {match}, both have amount ${pdf_amt:.2f}\n")
-                    output_lines.append(f"    Check PDF with Excel account number...\n")
-                    matched_accounts.add(match) # Mark the Excel match as handled
-                else:
-                    output_lines.append(f"❌ Account {pdf_acc} found in PDF but missing in Excel. Amount found = ${pdf_amt:.2f}\n")
-
-        # Check Excel accounts not yet matched (those only in Excel or not found by fuzzy match)
-        for excel_acc, excel_amt in excel_data.items():
-            if excel_acc not in matched_accounts:
-                output_lines.append(f"❌ Account {excel_acc} found in Excel but missing in PDF. Amount found = ${excel_amt:.2f}\n")
-
-        if not output_lines:
-            output_lines.append("No accounts found in either file for comparison or all matched perfectly.")
-        
-        self.results_text.insert(tk.END, "\n".join(output_lines))
-        self.results_text.insert(tk.END, "\nComparison complete.\n")
-        self.master.update_idletasks()
+                finished = event
+
+        if log_lines:
+            self.results_text.insert(tk.END, "".join(log_lines))
+            self.results_text.see(tk.END)
+
+        if finished is not None:
+            self._finish_run(finished)
+        elif self.worker_thread is not None:
+            self.master.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _finish_run(self, event):
+        if os.environ.get(STARTUP_PROBE_ENV):
+            _probe_milestone("result" if event[0] == "done" else event[0])
+            self.master.destroy()
+            return
+        self.worker_thread = None
+        self.run_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        kind = event[0]
+        if kind == "done":
+            self.status_text.set("Done.")
+            self.notebook.select(self.results_view)
+            messagebox.showinfo("Comparison Complete", "Comparison finished successfully! Check the results area.")
+        elif kind == "cancelled":
+            self.status_text.set("Cancelled.")
+        elif kind == "error":
+            _, title, message = event
+            self.status_text.set("Failed.")
+            messagebox.showerror(title, message)
+
+    def cancel_comparison(self):
+        if self.worker_thread is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_text.set("Cancelling...")
+            self._log("Cancelling... waiting for pages already being processed.\n")
+
+    def _run_startup_probe(self):
+        self.master.update() # make sure the window has been drawn
+        _probe_milestone("window")
+        pdf_path, excel_path = os.environ.get(PROBE_PDF_ENV), os.environ.get(PROBE_EXCEL_ENV)
+        if not (pdf_path and excel_path):
+            self.master.destroy()
+            return
+        self.pdf_file_path.set(pdf_path)
+        self.excel_file_path.set(excel_path)
+        self.run_comparison()
+
+    def on_close(self):
+        # Stop outstanding page work before the window goes away
+        self.cancel_event.set()
+        self.master.destroy()
 
     # This method orchestrates the entire comparison 
     def run_comparison(self):
 
+        if self.worker_thread is not None:
+            return # A comparison is already running
+
         pdf_path = self.pdf_file_path.get()
         excel_path = self.excel_file_path.get()
 
+        self.results_view.set_results([])
+        self.notebook.select(self.results_text)
         self.results_text.delete(1.0, tk.END) # Clear previous results
         self.results_text.insert(tk.END, "Starting comparison...\n")
         self.results_text.insert(tk.END, f"PDF: {os.path.basename(pdf_path) if pdf_path else 'Not selected'}\n")
         self.results_text.insert(tk.END, f"Excel: {os.path.basename(excel_path) if excel_path else 'Not selected'}\n\n")
-        self.master.update_idletasks() # Update GUI to show messages immediately
 
         if not pdf_path or not os.path.exists(pdf_path):
             messagebox.showerror("Error", "Please select a valid PDF file.")
@@ -361,13 +313,81 @@ class PDFExcelComparerApp:
             self.results_text.insert(tk.END, "Error: Excel file not found or not selected.\n")
             return
 
+        # Tk variables can't be read from the worker thread, so take a snapshot now
         try:
-            pdf_full_text = self._get_pdf_full_text(pdf_path)
-            pdf_data = self._get_info_from_pdf_text(pdf_full_text)
-            excel_data = self._get_info_from_xlsx_data(excel_path)
-            self._compare_data(pdf_data, excel_data)
-            messagebox.showinfo("Comparison Complete", "Comparison finished successfully! Check the results area.")
-
+            workers = max(1, int(self.ocr_workers.get()))
+        except (tk.TclError, ValueError):
+            workers = ocr_settings.DEFAULT_OCR_WORKERS
+        self.run_options = {
+            "workers": workers,
+            "use_text_layer": self.use_text_layer.get(),
+            "use_ocr_cache": self.use_ocr_cache.get(),
+            "use_checkpoints": self.use_checkpoints.get(),
+            "ocr_options": ocr_settings.OCROptions(
+                dpi=ocr_settings.ADAPTIVE_FIRST_DPI if self.adaptive_dpi.get() else ocr_settings.OCR_DPI,
+                whitelist=ocr_settings.LEDGER_WHITELIST if self.ledger_whitelist.get() else None,
+                adaptive=self.adaptive_dpi.get(),
+            ),
+            "timing_report": self.timing_report.get(),
+            "trace_path": None,
+        }
+        if self.save_trace.get():
+            trace_path = filedialog.asksaveasfilename(
+                title="Save trace as",
+                defaultextension=".json",
+                filetypes=[("JSON files", "*.json")]
+            )
+            if not trace_path:
+                return # Dialog cancelled
+            self.run_options["trace_path"] = trace_path
+
+        self.events = queue.Queue()
+        self.cancel_event.clear()
+        self.run_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_text.set("Running...")
+        self.worker_thread = threading.Thread(target=self._run_pipeline, args=(pdf_path, excel_path), daemon=True)
+        self.worker_thread.start()
+        self.master.after(POLL_INTERVAL_MS, self._poll_events)
+
+    # Runs on the worker thread; every outcome ends with exactly one done/cancelled/error event
+    def _run_pipeline(self, pdf_path, excel_path):
+        try:
+            load_pipeline() # usually already done in the background
+        except Exception as e:
+            self._log(f"Error: could not load the comparison engine: {e}\n")
+            self.events.put(("error", "Startup Error", f"Could not load the comparison engine: {e}"))
+            return
+        try:
+            self.run_started_at = time.perf_counter()
+            trace_path = self.run_options["trace_path"]
+            profiler = None
+            if self.run_options["timing_report"] or trace_path:
+                # The cProfile dump goes next to the trace, e.g. run.json -> run.prof
+                profiler = RunProfiler(profile_path=os.path.splitext(trace_path)[0] + ".prof" if trace_path else None)
+            summary = comparer_core.compare_files(
+                pdf_path, excel_path,
+                workers=self.run_options["workers"],
+                use_text_layer=self.run_options["use_text_layer"],
+                cache=OCRCache() if self.run_options["use_ocr_cache"] else None,
+                log=self._log,
+                on_page=self._on_page,
+                check_cancelled=self._check_cancelled,
+                ocr_options=self.run_options["ocr_options"],
+                profiler=profiler,
+                checkpoints=PageCheckpoints() if self.run_options["use_checkpoints"] else None,
+                log_results=False, # shown in the Results tab instead
+            )
+            self._log(f"{len(summary['results'])} accounts compared, {summary['problems']} mismatches. See the Results tab.\n")
+            self.events.put(("results", summary["results"]))
+            if trace_path:
+                profiler.write_trace(trace_path)
+                self._log(f"Trace written to {trace_path} (cProfile stats in {profiler.profile_path}).\n")
+            self.events.put(("done",))
+
+        except ComparisonCancelled:
+            self._log("Comparison cancelled.\n")
+            self.events.put(("cancelled",))
         except pytesseract.TesseractNotFoundError:
             # This specific error handling is for when Tesseract isn't found at all,
             # even after attempting to resolve its path, which means bundling failed or path is wrong.
@@ -375,30 +395,34 @@ class PDFExcelComparerApp:
                          "If running from a bundled application, ensure Tesseract was included "
                          "correctly during packaging. If running from script, check the "
                          "pytesseract.pytesseract.tesseract_cmd path and Tesseract installation.")
-            messagebox.showerror("OCR Engine Error", error_msg)
-            self.results_text.insert(tk.END, f"Error: {error_msg}\n")
+            self._log(f"Error: {error_msg}\n")
+            self.events.put(("error", "OCR Engine Error", error_msg))
         except FileNotFoundError as e:
-            messagebox.showerror("File Error", f"File not found: {e}\n"
-                                               "Please ensure the file exists and is accessible.")
-            self.results_text.insert(tk.END, f"Error: File not found - {e}\n")
+            self._log(f"Error: File not found - {e}\n")
+            self.events.put(("error", "File Error", f"File not found: {e}\n"
+                                                    "Please ensure the file exists and is accessible."))
         except pd.errors.EmptyDataError:
-            messagebox.showerror("Excel Error", "The Excel file is empty or contains no data.")
-            self.results_text.insert(tk.END, "Error: Excel file is empty or contains no data.\n")
+            self._log("Error: Excel file is empty or contains no data.\n")
+            self.events.put(("error", "Excel Error", "The Excel file is empty or contains no data."))
         except pd.errors.ParserError:
-            messagebox.showerror("Excel Error", "Could not parse Excel file. Is it a valid format and not corrupted?")
-            self.results_text.insert(tk.END, "Error: Could not parse Excel file. Invalid format or corrupted?\n")
+            self._log("Error: Could not parse Excel file. Invalid format or corrupted?\n")
+            self.events.put(("error", "Excel Error", "Could not parse Excel file. Is it a valid format and not corrupted?"))
         except ValueError as e:
-            messagebox.showerror("Data Error", f"Data processing error: {e}")
-            self.results_text.insert(tk.END, f"Data processing error: {e}\n")
+            self._log(f"Data processing error: {e}\n")
+            self.events.put(("error", "Data Error", f"Data processing error: {e}"))
         except Exception as e:
             # Catch any other unexpected errors
-            messagebox.showerror("An unexpected error occurred", f"An unexpected error occurred: {e}")
-            self.results_text.insert(tk.END, f"An unexpected error occurred: {e}\n")
-
+            self._log(f"An unexpected error occurred: {e}\n")
+            self.events.put(("error", "An unexpected error occurred", f"An unexpected error occurred: {e}"))
 
 def main():
+    multiprocessing.freeze_support() # Required for the OCR worker pool in the PyInstaller build
     root = tk.Tk()
     app = PDFExcelComparerApp(root)
+    if os.environ.get(STARTUP_PROBE_ENV):
+        root.after_idle(app._run_startup_probe)
+    else:
+        root.after(PRELOAD_DELAY_MS, lambda: threading.Thread(target=load_pipeline, daemon=True).start())
     root.mainloop()
 
 if __name__ == "__main__":
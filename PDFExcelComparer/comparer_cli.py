@@ -0,0 +1,275 @@
+"""
+Headless batch mode: compares many PDF/Excel pairs without opening a window.
+
+    python comparer_cli.py --pair statement.pdf export.xlsx
+    python comparer_cli.py --manifest pairs.csv --json results.json --csv results.csv
+    python comparer_cli.py --pdf-dir statements/ --excel-dir exports/ --jobs 8
+
+A manifest is either a CSV file with "pdf" and "excel" columns or a JSON list
+of {"pdf": ..., "excel": ...} objects; relative paths are resolved against the
+manifest's folder. With --pdf-dir/--excel-dir, files are paired by name
+(branch01.pdf <-> branch01.xlsx, .csv or .csv.gz).
+
+Exit status: 0 when every pair matches, 1 when any pair has mismatches,
+2 when any pair could not be processed.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import comparer_core
+import ocr_engine
+from ocr_cache import OCRCache
+from page_checkpoints import PageCheckpoints
+from run_profiler import RunProfiler
+
+EXIT_OK = 0
+EXIT_MISMATCHES = 1
+EXIT_ERRORS = 2
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls", ".csv", ".csv.gz")
+
+CSV_FIELDS = ["pdf", "excel"] + comparer_core.RESULT_FIELDS
+
+
+def read_manifest(manifest_path):
+    """Returns a list of (pdf_path, excel_path) pairs from a CSV or JSON manifest."""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, "r", encoding="utf-8-sig", newline="") as f:
+        if manifest_path.lower().endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+
+    pairs = []
+    for number, entry in enumerate(entries, start=1):
+        if "pdf" not in entry or "excel" not in entry:
+            raise ValueError(f"Manifest entry {number} in '{manifest_path}' needs both 'pdf' and 'excel'.")
+        pairs.append((os.path.join(base_dir, entry["pdf"]), os.path.join(base_dir, entry["excel"])))
+    return pairs
+
+
+def pair_directories(pdf_dir, excel_dir):
+    """
+    Pairs the PDFs in pdf_dir with the Excel files in excel_dir that have the same name.
+    Returns (pairs, unpaired) where unpaired lists the files without a partner.
+    """
+    def by_stem(folder, extensions):
+        files = {}
+        for name in sorted(os.listdir(folder)):
+            for ext in extensions:
+                if name.lower().endswith(ext):
+                    files[name[:-len(ext)].lower()] = os.path.join(folder, name)
+                    break
+        return files
+
+    pdfs = by_stem(pdf_dir, (".pdf",))
+    excels = by_stem(excel_dir, EXCEL_EXTENSIONS)
+    pairs = [(pdfs[stem], excels[stem]) for stem in sorted(pdfs) if stem in excels]
+    unpaired = [pdfs[stem] for stem in sorted(pdfs) if stem not in excels]
+    unpaired += [excels[stem] for stem in sorted(excels) if stem not in pdfs]
+    return pairs, unpaired
+
+
+def _run_pair(pdf_path, excel_path, options):
+    # Runs in a worker process when --jobs > 1, so everything it needs comes in through options
+    if options["verbose"]:
+        prefix = os.path.basename(pdf_path)
+        log = lambda message: sys.stderr.write("".join(f"[{prefix}] {line}\n" for line in message.splitlines() if line.strip()))
+    else:
+        log = lambda message: None
+
+    profiler = None
+    if options["timing"] or options["trace_path"] or options["profile_dir"]:
+        profile_path = None
+        if options["profile_dir"]:
+            profile_path = os.path.join(options["profile_dir"], os.path.splitext(os.path.basename(pdf_path))[0] + ".prof")
+        profiler = RunProfiler(profile_path=profile_path)
+
+    try:
+        summary = comparer_core.compare_files(
+            pdf_path, excel_path,
+            workers=options["ocr_workers"],
+            use_text_layer=options["use_text_layer"],
+            cache=OCRCache(options["cache_dir"]) if options["use_cache"] else None,
+            log=log,
+            ocr_options=options["ocr_options"],
+            profiler=profiler,
+            checkpoints=PageCheckpoints(options["checkpoint_dir"]) if options["use_checkpoints"] else None,
+        )
+        summary["error"] = None
+        if options["timing"] and not options["verbose"]:
+            # With -v the report is already part of the log
+            sys.stderr.write("".join(f"[{os.path.basename(pdf_path)}] {line}\n" for line in profiler.summary_lines()))
+    except Exception as e:
+        summary = {
+            "pdf": os.path.abspath(pdf_path),
+            "excel": os.path.abspath(excel_path),
+            "pdf_accounts": None,
+            "excel_accounts": None,
+            "problems": None,
+            "pages_retried": None,
+            "timings": None,
+            "results": [],
+            "error": f"{type(e).__name__}: {e}",
+        }
+    return summary
+
+
+def run_pairs(pairs, options, jobs):
+    """Compares every pair, jobs at a time, and returns the summaries in input order."""
+    if jobs <= 1 or len(pairs) <= 1:
+        return [_run_pair(pdf_path, excel_path, options) for pdf_path, excel_path in pairs]
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pairs))) as executor:
+        futures = [executor.submit(_run_pair, pdf_path, excel_path, options) for pdf_path, excel_path in pairs]
+        return [future.result() for future in futures]
+
+
+def write_json(path, summaries):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"pairs": summaries}, f, indent=2)
+
+
+def write_trace(path, summaries):
+    """Writes the stage and page timings of every pair to a JSON trace file."""
+    trace = [{"pdf": summary["pdf"], "excel": summary["excel"], "timings": summary["timings"]} for summary in summaries]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"pairs": trace}, f, indent=2)
+
+
+def write_csv(path, summaries):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS + ["error"])
+        writer.writeheader()
+        for summary in summaries:
+            if summary["error"]:
+                writer.writerow({"pdf": summary["pdf"], "excel": summary["excel"], "error": summary["error"]})
+                continue
+            for result in summary["results"]:
+                writer.writerow(dict(result, pdf=summary["pdf"], excel=summary["excel"], pdf_pages=comparer_core.format_pages(result["pdf_pages"]), error=""))
+
+
+def exit_status(summaries):
+    if any(summary["error"] for summary in summaries):
+        return EXIT_ERRORS
+    if any(summary["problems"] for summary in summaries):
+        return EXIT_MISMATCHES
+    return EXIT_OK
+
+
+def parse_region(value):
+    try:
+        region = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        region = ()
+    if len(region) != 4 or not all(0 <= part <= 1 for part in region) or region[0] >= region[2] or region[1] >= region[3]:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a crop box like 0,0.15,1,0.9")
+    return region
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Compare statement PDFs against Excel payment exports without a window.")
+    inputs = parser.add_argument_group("inputs (combine as needed)")
+    inputs.add_argument("--pair", nargs=2, action="append", default=[], metavar=("PDF", "EXCEL"), help="a single PDF/Excel pair; may be repeated")
+    inputs.add_argument("--manifest", help="CSV or JSON file listing pdf/excel pairs")
+    inputs.add_argument("--pdf-dir", help="folder of statement PDFs, paired by name with --excel-dir")
+    inputs.add_argument("--excel-dir", help="folder of Excel exports, paired by name with --pdf-dir")
+
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--csv", dest="csv_path", help="write one row per account result to this CSV file")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="number of pairs processed at the same time (default: number of CPUs)")
+    parser.add_argument("--ocr-workers", type=int, help="OCR worker processes per pair (default: CPUs divided by --jobs)")
+    parser.add_argument("--no-text-layer", action="store_true", help="always OCR, even pages that have a text layer")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the OCR cache")
+    parser.add_argument("--cache-dir", help="OCR cache folder (default: per-user cache folder)")
+    parser.add_argument("--no-checkpoints", action="store_true", help="don't save finished pages or resume interrupted runs")
+    parser.add_argument("--checkpoint-dir", help="page checkpoint folder (default: next to the OCR cache)")
+    parser.add_argument("--tesseract", help="path to the tesseract executable")
+    parser.add_argument("--ocr-backend", choices=[ocr_engine.BACKEND_AUTO, ocr_engine.BACKEND_TESSEROCR, ocr_engine.BACKEND_SUBPROCESS], default=ocr_engine.BACKEND_AUTO,
+                        help="tesserocr keeps one engine loaded per worker; subprocess runs the tesseract executable per page (default: auto)")
+    parser.add_argument("--ledger-whitelist", action="store_true", help="only let Tesseract output digits and the letters of the payment lines")
+    parser.add_argument("--adaptive-dpi", action="store_true",
+                        help=f"OCR at {ocr_engine.ADAPTIVE_FIRST_DPI} DPI first and re-OCR at {ocr_engine.RETRY_DPI} DPI only pages with unclear account or amount tokens")
+    parser.add_argument("--crop", action="append", type=parse_region, metavar="X0,Y0,X1,Y1",
+                        help="OCR only this part of each page, as fractions of the page size (e.g. 0,0.15,1,0.9); may be repeated")
+    parser.add_argument("--timing", action="store_true", help="print wall time, CPU time and peak memory per stage to stderr")
+    parser.add_argument("--trace", dest="trace_path", help="write per-stage and per-page timings to this JSON file")
+    parser.add_argument("--profile", dest="profile_dir", metavar="DIR", help="write a cProfile dump for each pair to this folder (<pdf name>.prof)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the pipeline log to stderr")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if bool(args.pdf_dir) != bool(args.excel_dir):
+        parser.error("--pdf-dir and --excel-dir must be given together")
+
+    pairs = [tuple(pair) for pair in args.pair]
+    if args.manifest:
+        pairs += read_manifest(args.manifest)
+    if args.pdf_dir:
+        dir_pairs, unpaired = pair_directories(args.pdf_dir, args.excel_dir)
+        for path in unpaired:
+            print(f"Warning: no matching file for '{path}', skipping it.", file=sys.stderr)
+        pairs += dir_pairs
+    if not pairs:
+        parser.error("nothing to compare; give --pair, --manifest or --pdf-dir/--excel-dir")
+
+    if args.tesseract:
+        ocr_engine.set_tesseract_cmd(args.tesseract)
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+
+    jobs = max(1, min(args.jobs, len(pairs)))
+    options = {
+        # Split the cores between the pairs running at once
+        "ocr_workers": args.ocr_workers or max(1, (os.cpu_count() or 1) // jobs),
+        "use_text_layer": not args.no_text_layer,
+        "use_cache": not args.no_cache,
+        "cache_dir": args.cache_dir,
+        "use_checkpoints": not args.no_checkpoints,
+        "checkpoint_dir": args.checkpoint_dir,
+        "verbose": args.verbose,
+        "timing": args.timing,
+        "trace_path": args.trace_path,
+        "profile_dir": args.profile_dir,
+        "ocr_options": ocr_engine.OCROptions(
+            dpi=ocr_engine.ADAPTIVE_FIRST_DPI if args.adaptive_dpi else ocr_engine.OCR_DPI,
+            whitelist=ocr_engine.LEDGER_WHITELIST if args.ledger_whitelist else None,
+            regions=args.crop,
+            backend=args.ocr_backend,
+            adaptive=args.adaptive_dpi,
+        ),
+    }
+
+    summaries = run_pairs(pairs, options, jobs)
+
+    for summary in summaries:
+        if summary["error"]:
+            label = f"ERROR     {summary['error']}"
+        elif summary["problems"]:
+            label = f"MISMATCH  {summary['problems']} problem(s)"
+        else:
+            label = "OK"
+        print(f"{os.path.basename(summary['pdf'])} <-> {os.path.basename(summary['excel'])}: {label}")
+
+    if args.json_path:
+        write_json(args.json_path, summaries)
+    if args.csv_path:
+        write_csv(args.csv_path, summaries)
+    if args.trace_path:
+        write_trace(args.trace_path, summaries)
+
+    return exit_status(summaries)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
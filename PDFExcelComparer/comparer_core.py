@@ -0,0 +1,518 @@
+"""
+Extraction and comparison logic shared by the window (comparer_app.py) and the
+command line (comparer_cli.py). Nothing in here touches Tk; progress and
+warnings are reported through the optional log/on_page callbacks.
+"""
+import csv
+import os
+from collections import defaultdict
+from contextlib import nullcontext
+
+import pandas as pd
+import pytesseract
+from openpyxl import Workbook, load_workbook
+
+import ocr_engine
+from account_matcher import AccountIndex
+from payment_scanner import PaymentScanner
+
+# Result statuses
+STATUS_MATCH = "match"
+STATUS_AMOUNT_MISMATCH = "amount_mismatch"
+STATUS_MISSING_IN_EXCEL = "missing_in_excel"
+STATUS_MISSING_IN_PDF = "missing_in_pdf"
+
+# How a PDF account was paired with an Excel account
+MATCH_EXACT = "exact"
+MATCH_APPROXIMATE = "approximate"
+
+
+class ComparisonCancelled(Exception):
+    """Raised from a progress callback to stop a running comparison."""
+
+
+def _no_log(message):
+    pass
+
+
+def _stage(profiler, name):
+    # Times a block with profiler (a run_profiler.RunProfiler), or does nothing without one
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def iter_pdf_page_texts(input_pdf_path, workers=ocr_engine.DEFAULT_OCR_WORKERS, use_text_layer=True, cache=None, log=_no_log, on_page=None, ocr_options=None, stats=None, profiler=None, checkpoints=None):
+    """
+    Yields (page_number, text) for every page as soon as it has been OCR'd
+    (or read from its text layer), in page order; page_number is 1-based.
+    ocr_options is an ocr_engine.OCROptions (None for the defaults).
+
+    on_page(page_number, page_count, source) is called after each page; an
+    exception raised from it stops the run and discards the remaining pages.
+    If stats is a dict, it is filled with the number of pages per source and
+    the number of pages that needed the adaptive second pass ("retried").
+    A RunProfiler given as profiler receives the timings of every page.
+    checkpoints is a page_checkpoints.PageCheckpoints to save finished pages
+    to and resume from (None to start from scratch every time).
+    """
+    try:
+        log("Opening PDF for OCR...\n")
+        with _stage(profiler, "PDF open"):
+            page_count = ocr_engine.get_page_count(input_pdf_path)
+        log(f"PDF opened ({page_count} pages). Starting OCR with {max(1, min(workers, page_count))} worker(s)...\n")
+
+        # Pages come back in page order whatever order the workers finish them in
+        ocr_options = ocr_options or ocr_engine.OCROptions()
+        source_counts = {} if stats is None else stats
+        retried = 0
+        pages = ocr_engine.iter_pdf_pages(input_pdf_path, workers=workers, options=ocr_options, use_text_layer=use_text_layer, cache=cache, checkpoints=checkpoints)
+        try:
+            for page in pages:
+                if page.retried:
+                    retried += 1
+                    log(f"Processed page {page.page_number + 1} of {page_count} ({page.source}, re-OCR'd at {ocr_options.retry_dpi} DPI).\n")
+                else:
+                    log(f"Processed page {page.page_number + 1} of {page_count} ({page.source}).\n")
+                source_counts[page.source] = source_counts.get(page.source, 0) + 1
+                if profiler is not None:
+                    profiler.add_page(page.page_number + 1, page.source, page.timings)
+                yield page.page_number + 1, page.text
+                if on_page is not None:
+                    on_page(page.page_number, page_count, page.source)
+        finally:
+            pages.close()  # if we stopped early, drops the pages that haven't started yet
+            source_counts["retried"] = retried
+
+        log(f"OCR complete. Text extracted from PDF ({source_counts.get(ocr_engine.SOURCE_TEXT_LAYER, 0)} pages from the text layer, "
+            f"{source_counts.get(ocr_engine.SOURCE_CACHE, 0)} from the OCR cache, {source_counts.get(ocr_engine.SOURCE_OCR, 0)} OCR'd).\n")
+        if source_counts.get(ocr_engine.SOURCE_CHECKPOINT):
+            log(f"Resumed {source_counts[ocr_engine.SOURCE_CHECKPOINT]} page(s) finished by an earlier run.\n")
+        if ocr_options.adaptive:
+            log(f"Adaptive DPI: {retried} page(s) needed a second pass at {ocr_options.retry_dpi} DPI.\n")
+    except pytesseract.TesseractNotFoundError:
+        raise RuntimeError(ocr_engine.TESSERACT_NOT_FOUND_MESSAGE)
+    except ComparisonCancelled:
+        raise
+    except Exception as e:
+        log(f"Error during PDF OCR: {e}\n")
+        raise
+
+
+# This function takes the input PDF document and turns it into a text file
+def get_pdf_full_text(input_pdf_path, **options):
+    """Returns the text of every page as one string with "--- Page N ---" separators."""
+    full_text = "".join(f"\n--- Page {page_number} ---\n{text}\n" for page_number, text in iter_pdf_page_texts(input_pdf_path, **options))
+    #DEBUG TEXT
+    #print(full_text)
+    return full_text
+
+
+def totals_from_payments(payments):
+    """Adds up PaymentRecords into {account: total amount}."""
+    account_totals = defaultdict(float)
+    for payment in payments:
+        account_totals[payment.account] += payment.amount
+    return account_totals
+
+
+def account_pages(payments):
+    """Returns {account: sorted list of the PDF pages its payments were found on}."""
+    pages = defaultdict(set)
+    for payment in payments:
+        if payment.page is not None:
+            pages[payment.account].add(payment.page)
+    return {account: sorted(found) for account, found in pages.items()}
+
+
+# This function scans the PDF page by page while OCR is still running and returns every payment found
+def get_pdf_payments(input_pdf_path, scanner=None, log=_no_log, **options):
+    """
+    Returns the PaymentRecords of a statement PDF. Each page is scanned as
+    soon as it comes back from OCR, so parsing overlaps with the OCR of later pages.
+    """
+    scanner = scanner or PaymentScanner()
+    scanner.reset()
+    payments = []
+    profiler = options.get("profiler")
+    for page_number, text in iter_pdf_page_texts(input_pdf_path, log=log, **options):
+        with _stage(profiler, "payment scan"):
+            payments.extend(scanner.scan(text, page=page_number, log=log))
+    log(f"Found {len(payments)} payments for {len(set(payment.account for payment in payments))} unique accounts in the PDF.\n")
+    return payments
+
+
+# This function takes the input pdf.txt file and finds all account numbers with their associated payments 
+def get_info_from_pdf_text(pdf_full_text, log=_no_log, scanner=None):
+    scanner = scanner or PaymentScanner()
+    scanner.reset()
+
+    log("Extracting account and payment info from PDF text...\n")
+    account_totals = totals_from_payments(scanner.scan(pdf_full_text, log=log))
+    log(f"Extracted {len(account_totals)} unique accounts from PDF text.\n")
+
+    return account_totals
+
+
+# Excel export layout
+ACCOUNT_COLUMN = 'merchant_defined_field_1'
+AMOUNT_COLUMN = 'amount'
+EXCEL_ACCOUNT_PATTERN = r'\b(W\d{6,7})\b'
+
+# How many of the skipped rows are listed individually in the warning summary
+MAX_REPORTED_ROWS = 20
+
+# Why an export row was skipped
+INVALID_AMOUNT = "invalid amount"
+ACCOUNT_NOT_STRING = "account cell is not a string"
+NO_VALID_ACCOUNT = "no valid account number (Wxxxxxx/Wxxxxxxx)"
+
+
+def aggregate_export_rows(df):
+    """
+    Vectorized per-account totals for a DataFrame of export rows.
+
+    df is indexed like read_excel output (0 = the row right under the
+    header). Returns (totals, invalid): totals is indexed by account with
+    "total" and "count" columns, in order of first appearance; invalid has the
+    spreadsheet "row", "reason" and "value" of each skipped row.
+    """
+    row_numbers = pd.Series(df.index + 2, index=df.index)
+    # object dtype keeps .str usable even when a column came back entirely empty
+    amount_cells = df[AMOUNT_COLUMN].astype(object)
+    account_cells = df[ACCOUNT_COLUMN].astype(object)
+
+    amounts = pd.to_numeric(amount_cells.str.strip(), errors="coerce")
+    accounts = account_cells.str.extract(EXCEL_ACCOUNT_PATTERN, expand=False)
+
+    bad_amount = amounts.isna()
+    bad_cell = ~bad_amount & account_cells.isna()
+    no_account = ~bad_amount & ~bad_cell & accounts.isna()
+
+    invalid = pd.concat([
+        pd.DataFrame({"row": row_numbers[bad_amount], "reason": INVALID_AMOUNT, "value": amount_cells[bad_amount]}),
+        pd.DataFrame({"row": row_numbers[bad_cell], "reason": ACCOUNT_NOT_STRING, "value": account_cells[bad_cell]}),
+        pd.DataFrame({"row": row_numbers[no_account], "reason": NO_VALID_ACCOUNT, "value": account_cells[no_account]}),
+    ]).sort_values("row", kind="stable")
+
+    valid = ~(bad_amount | bad_cell | no_account)
+    totals = (
+        pd.DataFrame({"account": accounts[valid], "amount": amounts[valid].astype(float)})
+        .groupby("account", sort=False)["amount"]
+        .agg(total="sum", count="count")
+    )
+    return totals, invalid
+
+
+def report_invalid_rows(invalid, invalid_count, log=_no_log, reason_counts=None):
+    """
+    Logs one summary of skipped rows instead of a warning line per row.
+
+    invalid may hold just the first skipped rows; reason_counts then gives
+    {reason: count} over all invalid_count of them.
+    """
+    if not invalid_count:
+        return
+    if reason_counts is None:
+        reason_counts = invalid["reason"].value_counts(sort=False).to_dict()
+    reasons = ", ".join(f"{count} with {reason}" for reason, count in reason_counts.items())
+    lines = [f"Warning: Skipped {invalid_count} Excel row(s): {reasons}.\n"]
+    for row in invalid.head(MAX_REPORTED_ROWS).itertuples(index=False):
+        lines.append(f"    Row {row.row}: {row.reason}: '{row.value}'\n")
+    if invalid_count > MAX_REPORTED_ROWS:
+        lines.append(f"    ... and {invalid_count - MAX_REPORTED_ROWS} more.\n")
+    log("".join(lines))
+
+
+# Exports are read and totalled this many rows at a time, so memory stays flat as files grow
+EXPORT_CHUNK_ROWS = 50_000
+
+CSV_EXTENSIONS = (".csv", ".csv.gz")
+
+
+def _check_export_columns(columns, input_path):
+    # Validate required columns 
+    if AMOUNT_COLUMN not in columns:
+        raise ValueError(f"Required column '{AMOUNT_COLUMN}' not found in Excel file '{input_path}'.")
+    if ACCOUNT_COLUMN not in columns:
+        raise ValueError(f"Required column '{ACCOUNT_COLUMN}' not found in Excel file '{input_path}'.")
+
+
+def _iter_csv_chunks(input_path, chunk_rows):
+    header = pd.read_csv(input_path, nrows=0).columns  # compression is inferred from the extension
+    _check_export_columns(header, input_path)
+    reader = pd.read_csv(input_path, usecols=[ACCOUNT_COLUMN, AMOUNT_COLUMN], dtype=str, chunksize=chunk_rows)
+    with reader:
+        yield from reader
+
+
+def _iter_xlsx_chunks(input_path, chunk_rows):
+    # Read-only mode streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()  # some exporters write a wrong sheet size; read every row that is there
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else None for cell in next(rows, ())]
+        _check_export_columns(header, input_path)
+        account_index = header.index(ACCOUNT_COLUMN)
+        amount_index = header.index(AMOUNT_COLUMN)
+
+        # Cells come back typed; turn them into strings like read_excel(dtype=str) does
+        to_str = lambda cell: None if cell is None else str(cell)
+        index, accounts, amounts = [], [], []
+        blank_start = None  # first of the blank rows seen since the last row with data
+        for row_index, row in enumerate(rows):
+            if all(cell is None for cell in row):
+                if blank_start is None:
+                    blank_start = row_index
+                continue
+            # read_excel keeps blank rows between data rows (they are reported as
+            # skipped) and drops the ones after the last data row, so blank rows
+            # are only passed on once a row with data follows them
+            pending = [(blank_index, None) for blank_index in range(blank_start, row_index)] if blank_start is not None else []
+            blank_start = None
+            for pending_index, cells in pending + [(row_index, row)]:
+                index.append(pending_index)
+                accounts.append(to_str(cells[account_index]) if cells is not None and account_index < len(cells) else None)
+                amounts.append(to_str(cells[amount_index]) if cells is not None and amount_index < len(cells) else None)
+                if len(index) == chunk_rows:
+                    yield pd.DataFrame({ACCOUNT_COLUMN: accounts, AMOUNT_COLUMN: amounts}, index=index)
+                    index, accounts, amounts = [], [], []
+        if index:
+            yield pd.DataFrame({ACCOUNT_COLUMN: accounts, AMOUNT_COLUMN: amounts}, index=index)
+    finally:
+        workbook.close()
+
+
+def iter_export_chunks(input_path, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Yields DataFrames holding only the account and amount columns (as strings) of
+    an .xlsx, .csv or .csv.gz export, at most chunk_rows rows at a time.
+    """
+    if input_path.lower().endswith(CSV_EXTENSIONS):
+        return _iter_csv_chunks(input_path, chunk_rows)
+    return _iter_xlsx_chunks(input_path, chunk_rows)
+
+
+# This function takes the input .xlsx/.csv file and finds all account numbers with their associated payments 
+def get_info_from_xlsx_data(input_xlsx_path, log=_no_log, streaming=True):
+    """
+    Returns {account: total amount} for an export.
+
+    By default the export is streamed chunk by chunk and only running
+    per-account totals are kept. streaming=False loads the whole .xlsx with
+    read_excel first, as older versions did.
+    """
+    log("Reading data from Excel...\n")
+
+    account_totals = {}
+    account_counts = {}
+    invalid_samples = []
+    sampled_count = 0
+    invalid_count = 0
+    reason_counts = {}
+    try:
+        if streaming:
+            chunks = iter_export_chunks(input_xlsx_path)
+        else:
+            chunks = [pd.read_excel(input_xlsx_path, engine="openpyxl", dtype=str)]
+
+        for chunk in chunks:
+            if not streaming:
+                _check_export_columns(chunk.columns, input_xlsx_path)
+            totals, invalid = aggregate_export_rows(chunk)
+
+            for account, total, count in totals.itertuples():
+                account_totals[account] = account_totals.get(account, 0.0) + total
+                account_counts[account] = account_counts.get(account, 0) + count
+
+            # Every skipped row is counted, but only a handful are kept for the report
+            invalid_count += len(invalid)
+            for reason, count in invalid["reason"].value_counts(sort=False).items():
+                reason_counts[reason] = reason_counts.get(reason, 0) + count
+            if len(invalid) and sampled_count < MAX_REPORTED_ROWS:
+                invalid_samples.append(invalid.head(MAX_REPORTED_ROWS - sampled_count))
+                sampled_count += len(invalid_samples[-1])
+    except ValueError:
+        raise
+    except Exception as e:
+        log(f"Error reading Excel file: {e}\n")
+        raise
+
+    if invalid_count:
+        report_invalid_rows(pd.concat(invalid_samples), invalid_count, log, reason_counts)
+
+    log(f"Extracted {len(account_totals)} unique accounts from {sum(account_counts.values())} Excel rows.\n")
+    return account_totals
+
+
+# Columns of an exported reconciliation report, in order
+RESULT_FIELDS = ["account", "excel_account", "pdf_amount", "excel_amount", "status", "match_type", "pdf_pages"]
+
+
+def _result(account, excel_account, pdf_amount, excel_amount, status, match_type, pdf_pages=()):
+    return {
+        "account": account,
+        "excel_account": excel_account,
+        "pdf_amount": pdf_amount,
+        "excel_amount": excel_amount,
+        "status": status,
+        "match_type": match_type,
+        "pdf_pages": list(pdf_pages),
+    }
+
+
+# This function takes the account totals from get_info_from_pdf_text and get_info_from_xlsx_data and compares them
+def compare_data(pdf_data, excel_data, pdf_pages=None):
+    """
+    Compares PDF and Excel account totals and returns one result dict per account.
+
+    Each result has account, excel_account, pdf_amount, excel_amount, status
+    (one of the STATUS_* values) and match_type (MATCH_EXACT,
+    MATCH_APPROXIMATE or None). Amounts missing on one side are None.
+    pdf_pages ({account: [page, ...]}, see account_pages) fills in each
+    result's pdf_pages; it is an empty list for accounts only in the Excel file.
+    """
+    pdf_pages = pdf_pages or {}
+    results = []
+
+    # Accounts present in both files are claimed up front, so an approximate
+    # match can never hand out an Excel account that has an exact partner
+    matched_accounts = {acc for acc in pdf_data if acc in excel_data}
+    fuzzy_index = AccountIndex(excel_data, exclude=matched_accounts)
+
+    # Compare PDF data against Excel data
+    for pdf_acc, pdf_amt in pdf_data.items():
+        if pdf_acc in excel_data:
+            excel_amt = excel_data[pdf_acc]
+            if abs(pdf_amt - excel_amt) < 0.01: # Check if difference is less than 1 cent
+                results.append(_result(pdf_acc, pdf_acc, pdf_amt, excel_amt, STATUS_MATCH, MATCH_EXACT, pdf_pages.get(pdf_acc, ())))
+            else:
+                results.append(_result(pdf_acc, pdf_acc, pdf_amt, excel_amt, STATUS_AMOUNT_MISMATCH, MATCH_EXACT, pdf_pages.get(pdf_acc, ())))
+        else:
+            # Try fuzzy matching only on unmatched Excel accounts for same amount
+            match = fuzzy_index.take(pdf_acc, pdf_amt)
+            if match is not None:
+                results.append(_result(pdf_acc, match, pdf_amt, excel_data[match], STATUS_MATCH, MATCH_APPROXIMATE, pdf_pages.get(pdf_acc, ())))
+                matched_accounts.add(match) # Mark the Excel match as handled
+            else:
+                results.append(_result(pdf_acc, None, pdf_amt, None, STATUS_MISSING_IN_EXCEL, None, pdf_pages.get(pdf_acc, ())))
+
+    # Check Excel accounts not yet matched (those only in Excel or not found by fuzzy match)
+    for excel_acc, excel_amt in excel_data.items():
+        if excel_acc not in matched_accounts:
+            results.append(_result(None, excel_acc, None, excel_amt, STATUS_MISSING_IN_PDF, None))
+
+    return results
+
+
+def count_problems(results):
+    """Number of results that are not a (exact or approximate) match."""
+    return sum(1 for result in results if result["status"] != STATUS_MATCH)
+
+
+def format_results(results):
+    """Turns compare_data results into the human readable report lines shown in the window."""
+    output_lines = []
+    for result in results:
+        status = result["status"]
+        if status == STATUS_MATCH and result["match_type"] == MATCH_EXACT:
+            output_lines.append(f"✅ Account {result['account']} matches: ${result['pdf_amount']:.2f} in both files.\n")
+        elif status == STATUS_MATCH:
+            output_lines.append(f"✅ Approximate match: PDF account {result['account']} ≈ Excel account {result['excel_account']}, both have amount ${result['pdf_amount']:.2f}\n")
+            output_lines.append(f"    Check PDF with Excel account number...\n")
+        elif status == STATUS_AMOUNT_MISMATCH:
+            output_lines.append(f"⚠️ Mismatch payment for account {result['account']}: PDF = ${result['pdf_amount']:.2f}, Excel = ${result['excel_amount']:.2f}\n")
+            output_lines.append(f"    Check PDF and Excel with account number...\n")
+        elif status == STATUS_MISSING_IN_EXCEL:
+            output_lines.append(f"❌ Account {result['account']} found in PDF but missing in Excel. Amount found = ${result['pdf_amount']:.2f}\n")
+        else:
+            output_lines.append(f"❌ Account {result['excel_account']} found in Excel but missing in PDF. Amount found = ${result['excel_amount']:.2f}\n")
+
+    if not output_lines:
+        output_lines.append("No accounts found in either file for comparison or all matched perfectly.")
+    return output_lines
+
+
+def format_pages(pages):
+    """Page list as text for reports, e.g. "3, 4"."""
+    return ", ".join(str(page) for page in pages)
+
+
+def _export_row(result):
+    return [format_pages(result[field]) if field == "pdf_pages" else result[field] for field in RESULT_FIELDS]
+
+
+# This function saves compare_data results as a CSV file, or as a workbook when the path ends in .xlsx
+def export_results(path, results):
+    if path.lower().endswith(".xlsx"):
+        workbook = Workbook(write_only=True)  # streams rows to disk instead of building every cell object
+        sheet = workbook.create_sheet("Reconciliation")
+        sheet.append(RESULT_FIELDS)
+        for result in results:
+            sheet.append(_export_row(result))
+        workbook.save(path)
+        return
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_FIELDS)
+        writer.writerows(_export_row(result) for result in results)
+
+
+def compare_files(pdf_path, excel_path, workers=ocr_engine.DEFAULT_OCR_WORKERS, use_text_layer=True, cache=None, log=_no_log, on_page=None, check_cancelled=None, scanner=None, ocr_options=None, profiler=None, checkpoints=None, log_results=True):
+    """
+    Runs the whole pipeline for one PDF/Excel pair and returns a summary dict
+    with the input paths, the compare_data results, the problem count and
+    how many pages needed the adaptive DPI second pass.
+
+    check_cancelled, if given, is called between stages and should raise to
+    stop the run. scanner is a PaymentScanner with any extra payment types or
+    different field fixes; ocr_options is an ocr_engine.OCROptions.
+    profiler is a run_profiler.RunProfiler that times each stage and page; its
+    report is added to the summary as "timings". checkpoints is a
+    page_checkpoints.PageCheckpoints that lets an interrupted run resume.
+    With log_results False the per-account report lines aren't logged, for
+    callers that show the results themselves.
+    """
+    if check_cancelled is None:
+        check_cancelled = lambda: None
+
+    if profiler is not None:
+        profiler.start()
+    try:
+        page_stats = {}
+        with _stage(profiler, "PDF pages (OCR + scan)"):
+            payments = get_pdf_payments(pdf_path, scanner=scanner, workers=workers, use_text_layer=use_text_layer, cache=cache, log=log, on_page=on_page, ocr_options=ocr_options, stats=page_stats, profiler=profiler, checkpoints=checkpoints)
+        check_cancelled()
+        pdf_data = totals_from_payments(payments)
+        pdf_pages = account_pages(payments)
+        with _stage(profiler, "Excel read"):
+            excel_data = get_info_from_xlsx_data(excel_path, log=log)
+        check_cancelled()
+
+        log("Comparing data...\n\n")
+        with _stage(profiler, "compare"):
+            results = compare_data(pdf_data, excel_data, pdf_pages)
+        if log_results:
+            with _stage(profiler, "report"):
+                log("\n".join(format_results(results)))
+        log("\nComparison complete.\n")
+    finally:
+        if profiler is not None:
+            profiler.finish()  # also stops cProfile when the run fails or is cancelled
+
+    timings = None
+    if profiler is not None:
+        log("\n" + "\n".join(profiler.summary_lines()) + "\n")
+        timings = profiler.to_dict()
+
+    return {
+        "pdf": os.path.abspath(pdf_path),
+        "excel": os.path.abspath(excel_path),
+        "pdf_accounts": len(pdf_data),
+        "excel_accounts": len(excel_data),
+        "problems": count_problems(results),
+        "pages_retried": page_stats.get("retried", 0),
+        "timings": timings,
+        "results": results,
+    }
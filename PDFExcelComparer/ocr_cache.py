@@ -0,0 +1,131 @@
+import hashlib
+import os
+import sys
+import tempfile
+
+# Bump when the way cached text is produced changes, so old entries stop matching
+CACHE_VERSION = "2"
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+
+
+def default_cache_dir():
+    """Per-user cache directory for OCR results."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "PDFExcelComparer", "ocr-cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdfexcelcomparer", "ocr-cache")
+
+
+# --- Least recently used folders ---
+# Shared by the OCR cache and the page checkpoints: each entry is a file whose
+# modification time is refreshed when it is used.
+
+def folder_entries(folder, suffix, sharded=False):
+    """
+    Returns (mtime, size, path) for the files ending in suffix in folder, or
+    with sharded in its subfolders.
+    """
+    entries = []
+    if not os.path.isdir(folder):
+        return entries
+    directories = [shard.path for shard in os.scandir(folder) if shard.is_dir()] if sharded else [folder]
+    for directory in directories:
+        for entry in os.scandir(directory):
+            if entry.name.endswith(suffix):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def evict_least_recent(entries, max_bytes):
+    """Removes the oldest of folder_entries() until the rest fit in max_bytes. Returns the number removed."""
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def remove_entries(entries):
+    for _, _, path in entries:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class OCRCache:
+    """
+    On-disk cache of raw Tesseract output, keyed by a hash of the rendered page.
+
+    Each entry is a small text file named after its key. Reading an entry
+    refreshes its modification time, and evict() removes the least recently
+    used entries until the cache fits in max_bytes. Only plain attributes are
+    stored on the object so it can be handed to OCR worker processes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(pixmaps, settings):
+        """
+        Hashes the rendered pixels of a page (one pixmap per OCR'd region)
+        together with a string of the settings that affect the OCR output.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION}|{settings}|".encode("utf-8"))
+        for pixmap in pixmaps:
+            digest.update(f"{pixmap.width}x{pixmap.height}x{pixmap.n}|".encode("utf-8"))
+            digest.update(pixmap.samples)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".txt")
+
+    def get(self, key):
+        """Returns the cached text for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # mark as recently used
+            return text
+        except OSError:
+            return None
+
+    def put(self, key, text):
+        """Stores text under key. The cache is best effort, so write errors are ignored."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename, so parallel workers never see half an entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        return folder_entries(self.cache_dir, ".txt", sharded=True)
+
+    def evict(self):
+        """Removes least recently used entries until the cache is within max_bytes. Returns the number removed."""
+        return evict_least_recent(self._entries(), self.max_bytes)
+
+    def clear(self):
+        remove_entries(self._entries())
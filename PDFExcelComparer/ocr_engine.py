@@ -0,0 +1,404 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+import pytesseract
+from PIL import Image
+
+# OCR settings live in ocr_settings so the window can use them without importing fitz/PIL
+from ocr_settings import (  # noqa: F401 (re-exported)
+    ADAPTIVE_FIRST_DPI, BACKEND_AUTO, BACKEND_SUBPROCESS, BACKEND_TESSEROCR, DEFAULT_OCR_WORKERS, LEDGER_WHITELIST,
+    MIN_WORD_CONFIDENCE, OCR_DPI, OCROptions, RETRY_DPI, TESSERACT_CONFIG, TESSERACT_NOT_FOUND_MESSAGE,
+)
+from page_checkpoints import page_fingerprint
+from run_profiler import cpu_time, peak_rss_bytes
+
+try:
+    # Optional: binds to the Tesseract C API so one engine stays loaded across pages
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+    # PyInstaller bundle path
+    tesseract_bundle_dir = os.path.join(sys._MEIPASS, "Tesseract-OCR")
+    pytesseract.pytesseract.tesseract_cmd = os.path.join(tesseract_bundle_dir, "tesseract.exe")
+    os.environ['TESSDATA_PREFIX'] = os.path.join(tesseract_bundle_dir, "tessdata")
+elif os.environ.get("TESSERACT_CMD"):
+    # explicit override, e.g. for headless runs on a Linux box
+    pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+elif sys.platform == "win32":
+    # development path
+    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+else:
+    pytesseract.pytesseract.tesseract_cmd = shutil.which("tesseract") or "tesseract"
+
+
+# Words that are meant to be an account number or an amount, and what they should look like
+ACCOUNT_LIKE_PATTERN = re.compile(r'^W.*\d.*\d.*\d')
+ACCOUNT_TOKEN_PATTERN = re.compile(r'^W\d{6,8}$')
+AMOUNT_LIKE_PATTERN = re.compile(r'\d\S*\.|\.\S*\d')
+AMOUNT_TOKEN_PATTERN = re.compile(r'^-?\$?\d{1,3}(,?\d{3})*\.\d{2}$')
+
+# A text layer is only trusted if it already contains account numbers; scanned
+# pages have no text layer (or just a scanner stamp) and go through OCR instead
+TEXT_LAYER_ACCOUNT_PATTERN = re.compile(r'\bW\d{6,8}\b')
+
+# Where a page's text came from
+SOURCE_TEXT_LAYER = "text layer"
+SOURCE_OCR = "ocr"
+SOURCE_CACHE = "cache"
+SOURCE_CHECKPOINT = "checkpoint"
+
+# retried is True when (part of) the page needed the adaptive second pass.
+# timings holds the seconds spent on the page ("wall", "cpu", "render", "encode", "ocr"),
+# the peak memory ("peak_rss") and "pid" of the process that handled it.
+PageText = namedtuple("PageText", ["page_number", "text", "source", "retried", "timings"], defaults=(False, None))
+
+
+def set_tesseract_cmd(path):
+    """Points pytesseract at a tesseract executable, here and in any worker processes started later."""
+    pytesseract.pytesseract.tesseract_cmd = path
+    os.environ["TESSERACT_CMD"] = path
+
+
+def resolve_backend(backend):
+    """Returns the backend that will actually be used for the requested one."""
+    if backend == BACKEND_SUBPROCESS or tesserocr is None or _tesserocr_failed:
+        return BACKEND_SUBPROCESS
+    return BACKEND_TESSEROCR
+
+
+# --- tesserocr backend ---
+# One engine per process, created on first use and reused for every page.
+_tesserocr_api = None
+_tesserocr_config = None
+_tesserocr_failed = False
+
+
+def _tessdata_dir():
+    if os.environ.get("TESSDATA_PREFIX"):
+        return os.environ["TESSDATA_PREFIX"]
+    candidate = os.path.join(os.path.dirname(pytesseract.pytesseract.tesseract_cmd), "tessdata")
+    return candidate if os.path.isdir(candidate) else None
+
+
+def _get_tesserocr_api(config):
+    global _tesserocr_api, _tesserocr_config
+    if _tesserocr_api is None or _tesserocr_config != config:
+        if _tesserocr_api is not None:
+            _tesserocr_api.End()
+        # Same engine and segmentation mode as the command line config
+        oem = re.search(r'--oem\s+(\d+)', config)
+        psm = re.search(r'--psm\s+(\d+)', config)
+        kwargs = {"lang": "eng", "oem": int(oem.group(1)) if oem else 1, "psm": int(psm.group(1)) if psm else 6}
+        if _tessdata_dir():
+            kwargs["path"] = _tessdata_dir()
+        _tesserocr_api = tesserocr.PyTessBaseAPI(**kwargs)
+        _tesserocr_config = config
+    return _tesserocr_api
+
+
+def _tesserocr_ocr(pix, options, with_words=False):
+    api = _get_tesserocr_api(options.config)
+    api.SetVariable("tessedit_char_whitelist", options.whitelist or "")
+    # Raw samples straight from the pixmap; no image file is written or decoded
+    api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+    text = api.GetUTF8Text()
+    if with_words:
+        return text, api.MapWordConfidences()
+    return text
+
+
+# --- tesseract executable backend ---
+
+def _pixmap_to_image(pix):
+    # Wraps the pixmap's samples without copying them
+    mode = "L" if pix.n == 1 else "RGB"
+    samples = getattr(pix, "samples_mv", None) or pix.samples
+    return Image.frombuffer(mode, (pix.width, pix.height), samples, "raw", mode, pix.stride, 1)
+
+
+def _write_input_png(pix, timings=None):
+    # The executable reads its input from a file. pytesseract would save a PIL
+    # image to a temporary PNG itself; doing it here lets the encode be timed
+    # apart from Tesseract, under timings["encode"].
+    started = time.perf_counter()
+    fd, path = tempfile.mkstemp(prefix="tess_", suffix=".png")
+    os.close(fd)
+    try:
+        _pixmap_to_image(pix).save(path, format="PNG")
+    except BaseException:
+        os.remove(path)
+        raise
+    if timings is not None:
+        timings["encode"] = timings.get("encode", 0.0) + time.perf_counter() - started
+    return path
+
+
+def _subprocess_ocr(pix, options, with_words=False, timings=None):
+    config = options.config
+    if options.whitelist:
+        config += f" -c tessedit_char_whitelist={options.whitelist}"
+    image_path = _write_input_png(pix, timings)
+    try:
+        if not with_words:
+            return pytesseract.image_to_string(image_path, config=config)  # Run OCR with the pre-processed image
+        # image_to_data gives per-word confidences; rebuild the text line by line from it
+        data = pytesseract.image_to_data(image_path, config=config, output_type=pytesseract.Output.DICT)
+    finally:
+        try:
+            os.remove(image_path)
+        except OSError:
+            pass
+    lines = {}
+    words = []
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        words.append((word, confidence))
+    return "\n".join(" ".join(line) for line in lines.values()), words
+
+
+def _recognize(pix, options, with_words=False, timings=None):
+    """
+    OCRs one pixmap. Returns the text, or (text, [(word, confidence), ...]) with with_words.
+    The executable backend adds the time it spends writing its input image to timings["encode"].
+    """
+    global _tesserocr_failed
+    if resolve_backend(options.backend) == BACKEND_TESSEROCR:
+        try:
+            return _tesserocr_ocr(pix, options, with_words)
+        except RuntimeError:
+            # Usually tessdata that the C API can't find; the executable may still work
+            _tesserocr_failed = True
+    return _subprocess_ocr(pix, options, with_words, timings)
+
+
+def count_suspect_tokens(words, min_confidence=MIN_WORD_CONFIDENCE):
+    """Number of account/amount-looking words that are low confidence or malformed."""
+    suspect = 0
+    for word, confidence in words:
+        token = word.strip(",;:")
+        if ACCOUNT_LIKE_PATTERN.match(token):
+            pattern = ACCOUNT_TOKEN_PATTERN
+        elif AMOUNT_LIKE_PATTERN.search(token):
+            pattern = AMOUNT_TOKEN_PATTERN
+        else:
+            continue
+        if confidence < min_confidence or not pattern.match(token):
+            suspect += 1
+    return suspect
+
+
+def _page_clips(page, options):
+    # None renders the whole page
+    if not options.regions:
+        return [None]
+    width, height = page.rect.width, page.rect.height
+    return [fitz.Rect(x0 * width, y0 * height, x1 * width, y1 * height) for x0, y0, x1, y1 in options.regions]
+
+
+def _render(page, clip, dpi):
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip)
+
+
+def _adaptive_ocr(page, clip, pix, options, timings=None):
+    # Returns (text, retried) for one page/region
+    text, words = _recognize(pix, options, with_words=True, timings=timings)
+    suspect = count_suspect_tokens(words, options.min_confidence)
+    if not suspect:
+        return text, False
+    retry_text, retry_words = _recognize(_render(page, clip, options.retry_dpi), options, with_words=True, timings=timings)
+    # Keep whichever pass read the account/amount tokens better
+    if count_suspect_tokens(retry_words, options.min_confidence) <= suspect:
+        return retry_text, True
+    return text, True
+
+
+def _cache_settings(options):
+    # Everything besides the pixels that changes what Tesseract returns
+    adaptive = f"{options.retry_dpi}/{options.min_confidence}" if options.adaptive else "off"
+    return f"{options.dpi}|{options.config}|{options.whitelist}|{options.regions}|{resolve_backend(options.backend)}|{adaptive}"
+
+
+def ocr_page(page, options=OCROptions(), cache=None, timings=None):
+    """
+    Rasterizes a single fitz page and returns (text, source, retried) with its raw OCR'd text.
+
+    If an OCRCache is given, Tesseract is skipped for pages whose rendered
+    pixels were seen before and source is SOURCE_CACHE. retried tells whether
+    the adaptive second pass ran. If timings is a dict, the seconds spent
+    rendering, writing image files for the tesseract executable and in OCR
+    are stored under "render", "encode" and "ocr". OCR character
+    fixes are not applied here; the payment scanner corrects the fields it reads.
+    """
+    started = time.perf_counter()
+    clips = _page_clips(page, options)
+    pixmaps = [_render(page, clip, options.dpi) for clip in clips]
+    rendered = time.perf_counter()
+    if timings is not None:
+        timings["render"] = rendered - started
+        timings["encode"] = 0.0
+    if cache is not None:
+        key = cache.make_key(pixmaps, _cache_settings(options))
+        text = cache.get(key)
+        if text is not None:
+            return text, SOURCE_CACHE, False
+
+    texts = []
+    retried = False
+    for clip, pix in zip(clips, pixmaps):
+        if options.adaptive:
+            text, region_retried = _adaptive_ocr(page, clip, pix, options, timings)
+            retried = retried or region_retried
+        else:
+            text = _recognize(pix, options, timings=timings)
+        texts.append(text)
+    text = "\n".join(texts)
+    if timings is not None:
+        # Includes any adaptive re-render, but not the image encode
+        timings["ocr"] = time.perf_counter() - rendered - timings["encode"]
+    if cache is not None:
+        cache.put(key, text)
+    return text, SOURCE_OCR, retried
+
+
+def get_text_layer(page):
+    """Returns the page's embedded text if it has usable account numbers, otherwise None."""
+    text = page.get_text("text", sort=True)  # sort=True reads top-to-bottom like the OCR output
+    if TEXT_LAYER_ACCOUNT_PATTERN.search(text):
+        return text
+    return None
+
+
+def extract_page_text(page, options=OCROptions(), use_text_layer=True, cache=None, timings=None):
+    """Returns (text, source, retried) for a page, only running OCR when the text layer can't be used."""
+    if use_text_layer:
+        text = get_text_layer(page)
+        if text is not None:
+            return text, SOURCE_TEXT_LAYER, False
+    return ocr_page(page, options, cache, timings)
+
+
+def _process_page(doc, page_number, options, use_text_layer, cache):
+    # One page start to finish, timed in whichever process handles it
+    timings = {"render": 0.0, "encode": 0.0, "ocr": 0.0}
+    wall, cpu = time.perf_counter(), cpu_time()
+    text, source, retried = extract_page_text(doc.load_page(page_number), options, use_text_layer, cache, timings)
+    timings["wall"] = time.perf_counter() - wall
+    timings["cpu"] = cpu_time() - cpu
+    timings["peak_rss"] = peak_rss_bytes()
+    timings["pid"] = os.getpid()
+    return PageText(page_number, text, source, retried, timings)
+
+
+def get_page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+# --- Worker process state ---
+# Every worker opens its own fitz document once (fitz handles can't be shared
+# between processes) and then OCRs whichever page numbers it is handed.
+_worker_doc = None
+_worker_options = OCROptions()
+_worker_use_text_layer = True
+_worker_cache = None
+
+
+def _init_worker(pdf_path, options, use_text_layer, cache):
+    global _worker_doc, _worker_options, _worker_use_text_layer, _worker_cache
+    _worker_doc = fitz.open(pdf_path)
+    _worker_options = options
+    _worker_use_text_layer = use_text_layer
+    _worker_cache = cache
+
+
+def _ocr_worker_page(page_number):
+    try:
+        return _process_page(_worker_doc, page_number, _worker_options, _worker_use_text_layer, _worker_cache)
+    except pytesseract.TesseractNotFoundError:
+        # TesseractNotFoundError can't be unpickled in the parent process
+        raise RuntimeError(TESSERACT_NOT_FOUND_MESSAGE)
+
+
+def iter_pdf_pages(pdf_path, workers=DEFAULT_OCR_WORKERS, options=OCROptions(), use_text_layer=True, cache=None, checkpoints=None):
+    """
+    Yields a PageText for every page of the PDF, always in page order.
+
+    Pages with a usable text layer are read directly (unless use_text_layer is
+    False); the rest are rasterized and OCR'd with the given OCROptions,
+    reusing results from cache (an OCRCache, or None to always run
+    Tesseract). With workers > 1 the pages are handled by a pool of worker
+    processes; pages that finish early are held back until all pages before
+    them are done.
+
+    With checkpoints (a page_checkpoints.PageCheckpoints), every finished page
+    is saved as soon as it is yielded, and pages finished by an earlier run
+    of the same PDF come back from there with source SOURCE_CHECKPOINT.
+    """
+    try:
+        if checkpoints is None:
+            yield from _iter_pages(pdf_path, workers, options, use_text_layer, cache, range(get_page_count(pdf_path)))
+        else:
+            yield from _iter_checkpointed_pages(pdf_path, workers, options, use_text_layer, cache, checkpoints)
+    finally:
+        # Cancelled and failed runs leave entries behind too, so trim the folders either way
+        if checkpoints is not None:
+            checkpoints.evict()
+        if cache is not None:
+            cache.evict()
+
+
+def _iter_checkpointed_pages(pdf_path, workers, options, use_text_layer, cache, checkpoints):
+    with fitz.open(pdf_path) as doc:
+        stream_digests = {}
+        fingerprints = [page_fingerprint(doc, page, stream_digests) for page in doc]
+    journal = checkpoints.open(fingerprints, f"{_cache_settings(options)}|text layer {use_text_layer}")
+    done = dict(journal.records)
+    pending = _iter_pages(pdf_path, workers, options, use_text_layer, cache,
+                          [page_number for page_number, fingerprint in enumerate(fingerprints) if fingerprint not in done])
+    try:
+        for page_number, fingerprint in enumerate(fingerprints):
+            if fingerprint in done:
+                text, source, retried = done[fingerprint]
+                yield PageText(page_number, text, SOURCE_CHECKPOINT, retried)
+            else:
+                page = next(pending)
+                journal.append(fingerprint, page_number, page.text, page.source, page.retried)
+                yield page
+    finally:
+        pending.close()
+        journal.close()
+
+
+def _iter_pages(pdf_path, workers, options, use_text_layer, cache, page_numbers):
+    # Yields the PageTexts of page_numbers (in increasing order)
+    if not page_numbers:
+        return
+    workers = max(1, min(workers, len(page_numbers)))
+
+    if workers == 1:
+        with fitz.open(pdf_path) as doc:
+            for page_number in page_numbers:
+                yield _process_page(doc, page_number, options, use_text_layer, cache)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_path, options, use_text_layer, cache))
+    try:
+        # Pages are queued in order, so waiting on them in order rarely blocks for long
+        futures = [executor.submit(_ocr_worker_page, page_number) for page_number in page_numbers]
+        for future in futures:
+            yield future.result()
+    finally:
+        # Also runs if the caller stops iterating early; drops any pages not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,40 @@
+"""
+OCR settings and defaults.
+
+Kept apart from ocr_engine, which imports PyMuPDF, PIL and pytesseract, so the
+window can show these options before any of those are loaded.
+"""
+import os
+from collections import namedtuple
+
+OCR_DPI = 200  # 200 (best range)
+TESSERACT_CONFIG = '--oem 1 --psm 6'  # '--oem 1 --psm 6' most accurate
+
+# Leave one core free so the window stays responsive while the pool is busy
+DEFAULT_OCR_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+TESSERACT_NOT_FOUND_MESSAGE = "Tesseract OCR engine not found. Ensure it's correctly bundled with the application."
+
+# Characters that appear in the fields we parse: digits, amount punctuation,
+# the W account prefix and the letters of the payment descriptions
+LEDGER_WHITELIST = "0123456789.,-$W" + "".join(sorted(set("ELF PAY AU" "XXDELETE FROM BAT" "CARD PAYME") - {" "}))
+
+# OCR backends
+BACKEND_AUTO = "auto"  # tesserocr when it is installed, otherwise the tesseract executable
+BACKEND_TESSEROCR = "tesserocr"
+BACKEND_SUBPROCESS = "subprocess"
+
+# Adaptive DPI: a cheap first pass, then a sharper second pass only where it's needed
+ADAPTIVE_FIRST_DPI = 150
+RETRY_DPI = 300
+MIN_WORD_CONFIDENCE = 60  # Tesseract word confidence, 0-100
+
+# How pages are OCR'd. regions is None for the whole page or a list of
+# (x0, y0, x1, y1) crop boxes given as fractions of the page size, e.g.
+# [(0, 0.15, 1, 0.9)] to skip the letterhead and footer. whitelist limits the
+# characters Tesseract may output (e.g. LEDGER_WHITELIST); None allows all.
+# With adaptive set, each page (or region) is OCR'd at dpi first and rendered
+# again at retry_dpi when an account or amount token comes back below
+# min_confidence or malformed.
+OCROptions = namedtuple("OCROptions", ["dpi", "config", "whitelist", "regions", "backend", "adaptive", "retry_dpi", "min_confidence"],
+                        defaults=(OCR_DPI, TESSERACT_CONFIG, None, None, BACKEND_AUTO, False, RETRY_DPI, MIN_WORD_CONFIDENCE))
@@ -0,0 +1,272 @@
+"""
+Append-only page checkpoints, so an interrupted run can pick up where it stopped.
+
+Every finished page is written as one JSON line to a journal file in the
+checkpoint folder. A journal belongs to one PDF: its file name is made from
+the OCR settings and the fingerprints of all pages (a hash of the page object
+and everything it draws from: content streams, Form XObjects, images, fonts,
+annotations). So re-opening the same PDF only processes the pages that never
+finished. A statement that is an earlier one with pages appended starts from
+the earlier one's journal, found by the first page's fingerprint that both
+file names start with, and only processes the new pages.
+
+A journal is locked while a run writes to it. Another process running the
+same PDF at the same time reads what is there but doesn't write.
+"""
+import hashlib
+import json
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ocr_cache import DEFAULT_MAX_BYTES, default_cache_dir, evict_least_recent, folder_entries, remove_entries
+
+# Bump when the journal format or the page fingerprint changes, so old journals are started over
+CHECKPOINT_VERSION = 2
+
+# An indirect reference ("12 0 R") in PDF object source
+_REFERENCE = re.compile(r"\b(\d+) \d+ R\b")
+
+
+# Windows locks byte ranges, and a locked byte can't be read by other processes;
+# the lock is taken on a byte far past the end of any journal
+_WINDOWS_LOCK_OFFSET = 0x7FFFFFFE
+
+
+def default_checkpoint_dir():
+    """Per-user folder for page checkpoints, next to the OCR cache."""
+    return os.path.join(os.path.dirname(default_cache_dir()), "checkpoints")
+
+
+def _inherited_key(doc, xref, key):
+    # Source of a page attribute that may be set on a parent node of the page tree
+    for _ in range(64):  # guards against a Parent loop in a broken file
+        kind, value = doc.xref_get_key(xref, key)
+        if kind != "null":
+            return value
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+    return ""
+
+
+def page_fingerprint(doc, page, stream_digests=None):
+    """
+    Hash of what the page draws: its size, rotation, page object and every
+    object reachable from it (content streams, resources with their Form
+    XObjects, images and fonts, annotations and their appearances), followed
+    depth first. Other pages and the page tree aren't followed. References are
+    hashed by the order they were reached in rather than by object number, so
+    a file whose objects were renumbered still matches.
+
+    stream_digests, a dict kept across the pages of one document, saves
+    hashing shared streams such as fonts again for every page.
+    """
+    if stream_digests is None:
+        stream_digests = {}
+    digest = hashlib.sha256()
+    digest.update(f"{tuple(page.rect)}|{page.rotation}|".encode("utf-8"))
+    root = doc.xref_object(page.xref, compressed=True) + "|" + _inherited_key(doc, page.xref, "Resources")
+    visited = {page.xref: 0}
+    stack = [root]  # object source still to hash, or the object numbers it references
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            digest.update(_REFERENCE.sub("R", item).encode("utf-8"))
+            stack.extend(reversed([int(xref) for xref in _REFERENCE.findall(item)]))
+            continue
+        if item in visited:
+            digest.update(f"@{visited[item]}".encode("utf-8"))
+            continue
+        visited[item] = len(visited)
+        if doc.xref_get_key(item, "Type")[1] in ("/Page", "/Pages"):
+            digest.update(b"page")  # a link target or the page tree, not something this page draws
+            continue
+        if doc.xref_is_stream(item):
+            if item not in stream_digests:
+                stream_digests[item] = hashlib.sha256(doc.xref_stream_raw(item) or b"").digest()
+            digest.update(stream_digests[item])
+        stack.append(doc.xref_object(item, compressed=True))
+    return digest.hexdigest()
+
+
+def _try_lock(f):
+    # Exclusive lock on an open file without waiting. The OS drops it when the
+    # file is closed or the process dies, so a crash never leaves it behind.
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(_WINDOWS_LOCK_OFFSET)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _read_journal(path, settings, header_only=False):
+    """
+    Returns (fingerprints, records, good_size) of a journal file written with
+    these settings, or None if it can't be read or was written differently.
+    good_size is the number of bytes holding complete lines.
+    """
+    fingerprints, records, good_size = None, {}, 0
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != CHECKPOINT_VERSION or header.get("settings") != settings:
+                return None
+            fingerprints = header["fingerprints"]
+            good_size = f.tell()
+            if header_only:
+                return fingerprints, records, good_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # the run stopped halfway through writing this page
+                record = json.loads(line)
+                records[record["fingerprint"]] = (record["text"], record["source"], record["retried"])
+                good_size += len(line)
+    except (OSError, ValueError, KeyError):
+        if fingerprints is None:
+            return None
+    return fingerprints, records, good_size
+
+
+class PageJournal:
+    """
+    One PDF's journal. records maps a page fingerprint to (text, source,
+    retried) for every page finished in an earlier run; append() adds a page
+    as soon as it is done. read_only is True when another process holds the
+    journal (or it can't be created); pages are then only kept in memory.
+    """
+
+    def __init__(self, path, settings, fingerprints):
+        self.path = path
+        self.settings = settings
+        self.fingerprints = list(fingerprints)
+        self.records = {}
+        self.read_only = False
+        self._file = None
+        self._started = False
+        self._good_size = 0  # bytes of the file holding complete lines
+        self._lock()
+        self._load()
+
+    def _lock(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a+b")  # creates the file without touching what is there
+        except OSError:
+            self.read_only = True
+            return
+        if not _try_lock(self._file):
+            self._file.close()
+            self._file = None
+            self.read_only = True
+
+    def _load(self):
+        journal = _read_journal(self.path, self.settings)
+        if journal is None or journal[0] != self.fingerprints:
+            return  # new, or written differently; start over
+        _, self.records, self._good_size = journal
+
+    def seed(self, records):
+        """Starts from the pages of another journal (a PDF this one is that PDF plus more pages of)."""
+        pages = set(self.fingerprints)
+        self.records = {fingerprint: record for fingerprint, record in records.items() if fingerprint in pages}
+
+    def _start(self):
+        # Keep the good part, dropping a line cut short by a crash, or start the file over
+        self._file.truncate(self._good_size)
+        if not self._good_size:
+            self._write({"version": CHECKPOINT_VERSION, "settings": self.settings, "fingerprints": self.fingerprints})
+            page_numbers = {fingerprint: page_number for page_number, fingerprint in enumerate(self.fingerprints)}
+            for fingerprint, (text, source, retried) in self.records.items():  # seeded from another journal
+                self._write({"fingerprint": fingerprint, "page": page_numbers[fingerprint], "text": text, "source": source, "retried": retried})
+        self._started = True
+
+    def _write(self, record):
+        self._file.write((json.dumps(record) + "\n").encode("utf-8"))
+
+    def append(self, fingerprint, page_number, text, source, retried):
+        """Stores a finished page. The journal is best effort, so write errors are ignored."""
+        if not self.read_only:
+            try:
+                if not self._started:
+                    self._start()
+                self._write({"fingerprint": fingerprint, "page": page_number, "text": text, "source": source, "retried": retried})
+                self._file.flush()  # on disk before the next page starts, in case we crash
+            except OSError:
+                pass
+        self.records[fingerprint] = (text, source, retried)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PageCheckpoints:
+    """
+    Folder of page journals, one per PDF and OCR settings. Like OCRCache,
+    evict() removes the least recently used journals until the folder fits
+    in max_bytes.
+    """
+
+    def __init__(self, checkpoint_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.checkpoint_dir = checkpoint_dir or default_checkpoint_dir()
+        self.max_bytes = max_bytes
+
+    def open(self, fingerprints, settings):
+        """
+        Returns the PageJournal for a PDF with these page fingerprints, read
+        from disk if it exists, or else started from the journal of the
+        longest earlier PDF whose pages this one begins with. Close it when done.
+        """
+        family = hashlib.sha256(f"v{CHECKPOINT_VERSION}|{settings}|{fingerprints[0] if fingerprints else ''}".encode("utf-8"))
+        pages = hashlib.sha256("|".join(fingerprints).encode("utf-8"))
+        prefix = family.hexdigest()[:32] + "-"
+        journal = PageJournal(os.path.join(self.checkpoint_dir, prefix + pages.hexdigest()[:32] + ".jsonl"), settings, fingerprints)
+        if journal.records:
+            try:
+                os.utime(journal.path)  # mark as recently used
+            except OSError:
+                pass
+        else:
+            earlier = self._find_earlier(prefix, journal)
+            if earlier is not None:
+                journal.seed(earlier)
+        return journal
+
+    def _find_earlier(self, prefix, journal):
+        # Records of the longest other journal in the family whose pages start this PDF's pages
+        best_path, best_length = None, 0
+        for _, _, path in self._entries():
+            if not os.path.basename(path).startswith(prefix) or path == journal.path:
+                continue
+            header = _read_journal(path, journal.settings, header_only=True)
+            if header is None:
+                continue
+            fingerprints = header[0]
+            if best_length < len(fingerprints) <= len(journal.fingerprints) and journal.fingerprints[:len(fingerprints)] == fingerprints:
+                best_path, best_length = path, len(fingerprints)
+        if best_path is None:
+            return None
+        earlier = _read_journal(best_path, journal.settings)
+        return earlier[1] if earlier is not None else None
+
+    def _entries(self):
+        return folder_entries(self.checkpoint_dir, ".jsonl")
+
+    def evict(self):
+        """Removes least recently used journals until the folder is within max_bytes. Returns the number removed."""
+        return evict_least_recent(self._entries(), self.max_bytes)
+
+    def clear(self):
+        remove_entries(self._entries())
@@ -0,0 +1,145 @@
+"""
+Single-pass scanner for account numbers and payment lines in statement text.
+
+All patterns are compiled into one alternation with named groups, so each
+page of text is walked once no matter how many payment types are registered.
+"""
+import re
+from collections import namedtuple
+
+# One payment found in the statement; page and line are 1-based (page is None when unknown)
+PaymentRecord = namedtuple("PaymentRecord", ["account", "kind", "amount", "page", "line"])
+
+# OCR misreads corrected inside account numbers and amounts (and nowhere
+# else): characters mapped to a digit are accepted where a digit is expected,
+# characters mapped to "" are ignored in and around an amount.
+DEFAULT_FIELD_FIXES = {
+    '@': '0', 'e': '0', 'Q': '0', 'O': '0',
+    'I': '1', 'l': '1', 'B': '8', 'S': '5',
+    '*': '', '$': '', ':': '', '%': '',
+}
+
+# Page separators written by comparer_core.get_pdf_full_text
+PAGE_MARKER_PATTERN = r'^--- Page (?P<page_number>\d+) ---$'
+
+# (kind, description pattern) for the payment lines we know about
+DEFAULT_PAYMENT_PATTERNS = [
+    ("ELF PAY", r'ELF PAY AU[^\S\n]*'),
+    ("XXDELETE FROM BAT", r'XXDELETE FR[O0]M [B8]AT[^\S\n]*'),
+    ("CARD PAYME", r'CARD PAYME[^\S\n]*'),
+]
+
+
+class PaymentScanner:
+    """
+    Finds payments and the account each one belongs to.
+
+    A payment is credited to the most recent account number seen, including
+    one earlier on the same line; that account carries over from one page to
+    the next, so payments split across pages still land on the right
+    account. Only the first match of each payment type on a line is counted.
+
+    New payment types are added with register(); they become part of the same
+    compiled pattern rather than another search per line.
+    """
+
+    def __init__(self, payment_patterns=DEFAULT_PAYMENT_PATTERNS, field_fixes=DEFAULT_FIELD_FIXES):
+        self._kinds = []
+        self._regex = None
+        self.current_account = None
+        self.field_fixes = dict(field_fixes)
+        self._fix_table = str.maketrans({char: replacement or None for char, replacement in self.field_fixes.items()})
+        for kind, description_pattern in payment_patterns:
+            self.register(kind, description_pattern)
+
+    def register(self, kind, description_pattern):
+        """
+        Adds a payment type. description_pattern matches the text in front of
+        the amount (including any spacing); it must not contain capture groups.
+        """
+        self._kinds.append((kind, description_pattern))
+        self._regex = None  # recompiled on next use
+
+    def reset(self):
+        """Forgets the current account, e.g. before scanning a different document."""
+        self.current_account = None
+
+    def _compile(self):
+        digit_like = "".join(re.escape(char) for char, fix in self.field_fixes.items() if fix.isdigit())
+        ignored = "".join(re.escape(char) for char, fix in self.field_fixes.items() if fix == "")
+        digit = f'[\\d{digit_like}]'
+        # Whitespace never crosses a line break, so a description can't pick up an amount from the next line
+        gap = f'(?:[^\\S\\n]|[{ignored}])*' if ignored else r'[^\S\n]*'
+
+        # \bW\d{6,8}\b, where the misread characters count as digits (and so as part of the word)
+        account_pattern = f'(?<![\\w{digit_like}])W{digit}{{6,8}}(?![\\w{digit_like}])'
+        amount_pattern = f'{gap}-?{gap}{digit}+{gap}\\.{gap}{digit}{{2}}'
+
+        parts = [
+            f'(?P<page>{PAGE_MARKER_PATTERN})',
+            f'(?P<account>{account_pattern})',
+        ]
+        for index, (_, description_pattern) in enumerate(self._kinds):
+            parts.append(f'(?:{description_pattern})(?P<amount{index}>{amount_pattern})')
+        return re.compile("|".join(parts), re.MULTILINE)
+
+    def fix_field(self, value):
+        """Applies the field fixes to an account number or amount."""
+        return value.translate(self._fix_table)
+
+    def scan(self, text, page=None, log=None):
+        """
+        Yields a PaymentRecord for every payment in text, in reading order.
+
+        page is the page number the text came from; when scanning a whole
+        document instead, the "--- Page N ---" markers in it set the page.
+        Amounts that can't be parsed are reported through log and skipped.
+        """
+        if self._regex is None:
+            self._regex = self._compile()
+
+        line_number = None
+        page_first_line = 0  # line where the current page's text starts
+        line_account = None
+        line_payments = {}
+        position, match_line = 0, 0
+
+        for match in self._regex.finditer(text):
+            # Only the text between matches is searched for line breaks
+            match_line += text.count("\n", position, match.start())
+            position = match.start()
+
+            if line_number is not None and match_line != line_number:
+                yield from self._flush_line(line_account, line_payments, page, line_number - page_first_line + 1, log)
+                line_account, line_payments = None, {}
+            line_number = match_line
+
+            group = match.lastgroup
+            if group == "page":
+                page = int(match.group("page_number"))
+                page_first_line = match_line + 1
+            elif group == "account":
+                if line_account is None:
+                    line_account = self.fix_field(match.group())
+            else:
+                kind_index = int(group[len("amount"):])
+                line_payments.setdefault(kind_index, match.group(group))
+
+        if line_number is not None:
+            yield from self._flush_line(line_account, line_payments, page, line_number - page_first_line + 1, log)
+
+    def _flush_line(self, line_account, line_payments, page, line, log):
+        # The account on a line applies to that line's payments wherever it appears in it
+        if line_account is not None:
+            self.current_account = line_account
+        if not line_payments or self.current_account is None:
+            return
+        for kind_index in sorted(line_payments):
+            payment_str = line_payments[kind_index]
+            try:
+                amount = float("".join(self.fix_field(payment_str).split()))
+            except ValueError:
+                if log is not None:
+                    log(f"Warning: Could not parse payment amount from '{payment_str}' for account {self.current_account}.\n")
+                continue
+            yield PaymentRecord(self.current_account, self._kinds[kind_index][0], amount, page, line)
@@ -0,0 +1,256 @@
+"""
+Virtualized table of comparison results for the window.
+
+Only the rows that fit on screen exist as Treeview items; scrolling, sorting
+and filtering change which records those items show. So tens of thousands of
+accounts scroll as smoothly as ten, and loading a new result list costs
+nothing beyond keeping a reference to it.
+"""
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+
+# (result key, heading, width, anchor)
+COLUMNS = [
+    ("account", "PDF Account", 110, "w"),
+    ("excel_account", "Excel Account", 110, "w"),
+    ("pdf_amount", "PDF Amount", 100, "e"),
+    ("excel_amount", "Excel Amount", 100, "e"),
+    ("status", "Status", 130, "w"),
+    ("match_type", "Match", 90, "w"),
+    ("pdf_pages", "PDF Pages", 90, "w"),
+]
+
+# comparer_core's status values; it isn't imported here so the window opens without pandas
+STATUS_LABELS = {
+    "match": "Match",
+    "amount_mismatch": "Amount mismatch",
+    "missing_in_excel": "Missing in Excel",
+    "missing_in_pdf": "Missing in PDF",
+}
+
+ROW_HEIGHT = 22
+HEADING_HEIGHT = 28
+WHEEL_ROWS = 3  # rows scrolled per mouse wheel notch
+
+
+def _cell(result, key):
+    value = result[key]
+    if value is None:
+        return ""
+    if key in ("pdf_amount", "excel_amount"):
+        return f"${value:,.2f}"
+    if key == "status":
+        return STATUS_LABELS.get(value, value)
+    if key == "pdf_pages":
+        return ", ".join(str(page) for page in value)
+    return value
+
+
+def _sort_key(key):
+    # Empty values sort after the others (before them when reversed)
+    if key == "pdf_pages":
+        return lambda result: (not result[key], result[key])
+    return lambda result: (result[key] is None, result[key] if result[key] is not None else "")
+
+
+class ResultsView(tk.Frame):
+    """
+    Sortable, filterable results table with CSV/XLSX export. Click a heading
+    to sort by it (again to reverse); select a row to see which PDF pages
+    the account's payments were found on.
+    """
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self._results = []   # everything from the last run
+        self._view = []      # filtered and sorted; what the table scrolls over
+        self._top = 0        # index in _view of the first visible row
+        self._capacity = 1   # rows that fit in the table
+        self._sort_column = None
+        self._sort_reverse = False
+        self._selected = None
+
+        toolbar = tk.Frame(self, bg=self["bg"])
+        toolbar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        self.problems_only = tk.BooleanVar(value=False)
+        tk.Checkbutton(toolbar, text="Mismatches only", variable=self.problems_only, command=self._apply_filter, font=("Inter", 10), bg=self["bg"], fg="#334155", activebackground=self["bg"], selectcolor="white").pack(side="left")
+        tk.Label(toolbar, text="Find account:", font=("Inter", 10), bg=self["bg"], fg="#334155").pack(side="left", padx=(10, 2))
+        self.search_text = tk.StringVar()
+        self.search_text.trace_add("write", lambda *_: self._apply_filter())
+        tk.Entry(toolbar, textvariable=self.search_text, width=14, font=("Inter", 10)).pack(side="left")
+        tk.Button(toolbar, text="Export Excel...", command=lambda: self.export(".xlsx"), font=("Inter", 10)).pack(side="right", padx=2)
+        tk.Button(toolbar, text="Export CSV...", command=lambda: self.export(".csv"), font=("Inter", 10)).pack(side="right", padx=2)
+        self.count_text = tk.StringVar(value="")
+        tk.Label(toolbar, textvariable=self.count_text, font=("Inter", 10), bg=self["bg"], fg="#64748B").pack(side="right", padx=10)
+
+        ttk.Style(self).configure("Results.Treeview", rowheight=ROW_HEIGHT)
+        self.tree = ttk.Treeview(self, columns=[key for key, _, _, _ in COLUMNS], show="headings", selectmode="browse", height=1, style="Results.Treeview")
+        for key, heading, width, anchor in COLUMNS:
+            self.tree.heading(key, text=heading, command=lambda key=key: self.sort_by(key))
+            self.tree.column(key, width=width, anchor=anchor, stretch=True)
+        self.tree.tag_configure("problem", foreground="#B91C1C")
+        self.tree.tag_configure("approximate", foreground="#B45309")
+        self.tree.grid(row=1, column=0, sticky="nsew")
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.detail_text = tk.StringVar(value="")
+        tk.Label(self, textvariable=self.detail_text, anchor="w", justify="left", font=("Inter", 10), bg=self["bg"], fg="#334155").grid(row=2, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self._capacity))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self._capacity))
+
+    def set_results(self, results):
+        """Shows a new list of compare_data result dicts."""
+        self._results = results
+        self._selected = None
+        self.detail_text.set("")
+        self._apply_filter()
+
+    def _apply_filter(self):
+        needle = self.search_text.get().strip().upper()
+        view = self._results
+        if self.problems_only.get():
+            view = [result for result in view if result["status"] != "match"]
+        if needle:
+            view = [result for result in view
+                    if needle in (result["account"] or "") or needle in (result["excel_account"] or "")]
+        if self._sort_column is not None:
+            view = sorted(view, key=_sort_key(self._sort_column), reverse=self._sort_reverse)
+        elif view is self._results:
+            view = list(view)
+        self._view = view
+        self._top = 0
+        problems = sum(1 for result in self._results if result["status"] != "match")
+        self.count_text.set(f"{len(self._view):,} of {len(self._results):,} accounts, {problems:,} mismatches")
+        self._render()
+
+    def sort_by(self, key):
+        if self._sort_column == key:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column, self._sort_reverse = key, False
+        for column, heading, _, _ in COLUMNS:
+            arrow = (" ▼" if self._sort_reverse else " ▲") if column == key else ""
+            self.tree.heading(column, text=heading + arrow)
+        self._apply_filter()
+
+    # --- Virtual scrolling ---
+
+    def _render(self):
+        self._top = max(0, min(self._top, len(self._view) - self._capacity))
+        visible = self._view[self._top:self._top + self._capacity]
+        items = self.tree.get_children()
+        for index in range(len(items), len(visible)):
+            self.tree.insert("", "end", iid=f"row{index}")
+        for iid in items[len(visible):]:
+            self.tree.delete(iid)
+
+        selected_iid = None
+        for index, result in enumerate(visible):
+            if result["status"] != "match":
+                tags = ("problem",)
+            elif result["match_type"] == "approximate":
+                tags = ("approximate",)
+            else:
+                tags = ()
+            self.tree.item(f"row{index}", values=[_cell(result, key) for key, _, _, _ in COLUMNS], tags=tags)
+            if result is self._selected:
+                selected_iid = f"row{index}"
+        if selected_iid is not None:
+            self.tree.selection_set(selected_iid)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        if self._view:
+            self.scrollbar.set(self._top / len(self._view), min(1.0, (self._top + self._capacity) / len(self._view)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_resize(self, event):
+        capacity = max(1, (event.height - HEADING_HEIGHT) // ROW_HEIGHT)
+        if capacity != self._capacity:
+            self._capacity = capacity
+            self._render()
+
+    def _scroll_by(self, rows):
+        self._top += rows
+        self._render()
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * len(self._view))
+        elif args[0] == "scroll":
+            step = self._capacity if args[2] == "pages" else 1
+            self._top += int(args[1]) * step
+        self._render()
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch; macOS reports small steps
+        notches = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        return self._scroll_by(-notches * WHEEL_ROWS)
+
+    # --- Selection and details ---
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        index = self._top + self.tree.index(selection[0])
+        if index < len(self._view):
+            self._selected = self._view[index]
+            self._show_detail(self._selected)
+
+    def _move_selection(self, step):
+        if not self._view:
+            return "break"
+        index = self._view.index(self._selected) + step if self._selected is not None and self._selected in self._view else self._top
+        index = max(0, min(index, len(self._view) - 1))
+        self._selected = self._view[index]
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + self._capacity:
+            self._top = index - self._capacity + 1
+        self._render()
+        self._show_detail(self._selected)
+        return "break"
+
+    def _show_detail(self, result):
+        account = result["account"] or result["excel_account"]
+        pages = result["pdf_pages"]
+        if not pages:
+            self.detail_text.set(f"{account}: not found in the PDF.")
+        elif len(pages) == 1:
+            self.detail_text.set(f"{account}: payments on PDF page {pages[0]}.")
+        else:
+            self.detail_text.set(f"{account}: payments split across {len(pages)} PDF pages: {', '.join(str(page) for page in pages)}.")
+
+    # --- Export ---
+
+    def export(self, extension):
+        if not self._view:
+            messagebox.showinfo("Export", "There are no results to export.")
+            return
+        file_types = [("Excel workbook", "*.xlsx")] if extension == ".xlsx" else [("CSV file", "*.csv")]
+        path = filedialog.asksaveasfilename(title="Export results", defaultextension=extension, filetypes=file_types)
+        if not path:
+            return
+        import comparer_core  # loaded by the time there are results to export
+        try:
+            comparer_core.export_results(path, self._view)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Could not write {path}: {e}")
+            return
+        self.count_text.set(f"Exported {len(self._view):,} rows to {path}")
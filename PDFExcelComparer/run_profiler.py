@@ -0,0 +1,202 @@
+"""
+Timing and memory instrumentation for a comparison run.
+
+A RunProfiler collects wall time, CPU time and memory for each stage of the
+pipeline (stages with the same name add up, e.g. the payment scan of every
+page) and the per-page timings reported by the OCR workers. A stage's memory
+is the highest resident size seen while it ran, sampled by a background
+thread, and how far that is above where the stage started; tracemalloc would
+see allocations exactly but slows the pipeline down several times. It can
+render a short text summary, write everything to a JSON trace file and,
+optionally, run cProfile over the whole run.
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def cpu_time():
+    """
+    CPU seconds used by this process and the child processes it has waited
+    for (the tesseract executable), user plus system.
+    """
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process in bytes, or None when it can't be read."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)  # peak_wset only exists on Windows
+    return None
+
+
+def current_rss_bytes():
+    """Resident memory of this process right now in bytes, or None when it can't be read."""
+    try:
+        with open("/proc/self/statm", "rb") as f:  # Linux; much cheaper than psutil
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+# How often the memory of running stages is sampled
+MEMORY_SAMPLE_SECONDS = 0.01
+
+
+def _megabytes(value):
+    return "n/a" if value is None else f"{value / (1024 * 1024):.0f} MB"
+
+
+class RunProfiler:
+    """
+    Records stage and page timings for one comparison run.
+
+    Call start() before the run and finish() after it; stage() is a context
+    manager around each stage and add_page() takes the timings dict of an
+    ocr_engine.PageText. With profile_path set, cProfile runs between start()
+    and finish() in the calling thread (OCR worker processes aren't profiled)
+    and its stats are written to that file.
+    """
+
+    def __init__(self, profile_path=None):
+        self.profile_path = profile_path
+        self.stages = {}
+        self.pages = []
+        self.wall = None
+        self.cpu = None
+        self._started_wall = None
+        self._started_cpu = None
+        self._profile = None
+        self._open_stages = []  # memory of the stages running right now, innermost last
+        self._memory_lock = threading.Lock()
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+
+    def start(self):
+        self._started_wall = time.perf_counter()
+        self._started_cpu = cpu_time()
+        if current_rss_bytes() is not None:
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample_memory, name="memory-sampler", daemon=True)
+            self._sampler.start()
+        if self.profile_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def finish(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_path)
+            self._profile = None
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        self.wall = time.perf_counter() - self._started_wall
+        self.cpu = cpu_time() - self._started_cpu
+
+    def _note_memory(self):
+        # Raises the peak of every running stage to the current resident size
+        rss = current_rss_bytes()
+        if rss is None:
+            return
+        with self._memory_lock:
+            for memory in self._open_stages:
+                memory["peak"] = max(memory["peak"], rss)
+
+    def _sample_memory(self):
+        while not self._stop_sampling.wait(MEMORY_SAMPLE_SECONDS):
+            self._note_memory()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the code inside it. peak_rss is the highest resident size seen
+        while the stage ran and rss_growth how far that was above the size it
+        started at (the largest of any call to a stage with this name).
+        """
+        rss = current_rss_bytes()
+        memory = {"start": rss, "peak": rss} if rss is not None else None
+        if memory is not None:
+            with self._memory_lock:
+                self._open_stages.append(memory)
+        wall, cpu = time.perf_counter(), cpu_time()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0, "peak_rss": None, "rss_growth": None})
+            record["wall"] += time.perf_counter() - wall
+            record["cpu"] += cpu_time() - cpu
+            record["calls"] += 1
+            if memory is not None:
+                self._note_memory()
+                with self._memory_lock:
+                    # By identity: a nested stage's dict can compare equal to its parent's
+                    self._open_stages[:] = [other for other in self._open_stages if other is not memory]
+                record["peak_rss"] = max(record["peak_rss"] or 0, memory["peak"])
+                record["rss_growth"] = max(record["rss_growth"] or 0, memory["peak"] - memory["start"])
+
+    def add_page(self, page_number, source, timings):
+        """Stores the timings of one page; page_number is 1-based."""
+        if timings is not None:
+            self.pages.append(dict(timings, page=page_number, source=source))
+
+    def to_dict(self):
+        return {
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "peak_rss": peak_rss_bytes(),
+            "stages": [dict(record, name=name) for name, record in self.stages.items()],
+            "pages": self.pages,
+        }
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary_lines(self):
+        """The timing report shown under the comparison results."""
+        lines = ["Timing report (wall / CPU / peak memory during the stage, and its growth):"]
+        for name, record in self.stages.items():
+            growth = "" if record["rss_growth"] is None else f"+{_megabytes(record['rss_growth'])}"
+            lines.append(f"  {name:<28} {record['wall']:8.2f} s  {record['cpu']:8.2f} s  {_megabytes(record['peak_rss']):>8}  {growth:>9}")
+
+        if self.pages:
+            count = len(self.pages)
+            total_wall = sum(page["wall"] for page in self.pages)
+            total_cpu = sum(page["cpu"] for page in self.pages)
+            render = sum(page.get("render", 0.0) for page in self.pages)
+            encode = sum(page.get("encode", 0.0) for page in self.pages)
+            ocr = sum(page.get("ocr", 0.0) for page in self.pages)
+            slowest = max(self.pages, key=lambda page: page["wall"])
+            worker_peak = max((page["peak_rss"] for page in self.pages if page.get("peak_rss") is not None), default=None)
+            lines.append(f"  Pages: {count}, {total_wall / count:.2f} s wall and {total_cpu / count:.2f} s CPU per page "
+                         f"(render {render:.2f} s, image encode {encode:.2f} s, OCR {ocr:.2f} s in total)")
+            lines.append(f"  Slowest page: {slowest['page']} ({slowest['wall']:.2f} s, {slowest['source']}); "
+                         f"largest worker peak memory {_megabytes(worker_peak)}")
+
+        if self.wall is not None:
+            lines.append(f"  {'Total':<28} {self.wall:8.2f} s  {self.cpu:8.2f} s  {_megabytes(peak_rss_bytes()):>8}")
+        return lines